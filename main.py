@@ -1,4 +1,4 @@
-iport discord
+import discord
 from discord.ext import commands
 import json
 import os
@@ -6,8 +6,22 @@ import random
 import asyncio
 from datetime import datetime, timedelta
 import time
+import io
 import sys
-import aiofiles
+import sqlite3
+import threading
+import signal
+import queue
+import marshal
+import struct
+import zlib
+import heapq
+import math
+from bisect import bisect_right
+import re
+from collections import OrderedDict, deque
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
 # Railway logging setup
 import logging
@@ -258,20 +272,23 @@ PRIORITY_ROLES = {
     1410917146459897928: 3,
 }
 
+# Cooldown length per command, in seconds
+COOLDOWN_SECONDS = {
+    "daily": 24 * 3600, "work": 3 * 3600, "crime": 3600, "gift": 3, "buy": 3,
+    "coinflip": 5, "duel": 10, "giveaway": 30, "mines": 10,
+    "roblox": 24 * 3600, "doors": 3
+}
+
 # Data storage
 user_data = {}
+cold_accounts = {}
 shop_data = []
-cooldowns = {
-    "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-    "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-    "roblox": {}, "doors": {}
-}
+cooldowns = None  # CooldownStore, created with the cooldown section below
 pending_duels = {}
 active_giveaways = {}
 giveaway_daily_totals = {}
 active_mines_games = {}
 invite_data = {}
-user_message_times = {}
 roblox_data = {}
 active_minigame = None
 minigame_message_count = 0
@@ -287,6 +304,131 @@ MINES_CONFIG_FILE = 'mines_config.json'
 INVITE_DATA_FILE = 'invite_data.json'
 ANTISPAM_DATA_FILE = 'antispam_data.json'
 ROBLOX_DATA_FILE = 'roblox_data.json'
+USER_PROFILES_FILE = 'user_profiles.json'
+
+# Names the files that make up the current (and previous) snapshot generation
+DATA_MANIFEST_FILE = 'data_manifest.json'
+
+# Append-only balance journal, folded back into USER_DATA_FILE by compaction
+BALANCE_JOURNAL_FILE = 'balance_journal.log'
+BALANCE_JOURNAL_OLD_FILE = 'balance_journal.log.old'
+JOURNAL_COMPACT_BYTES = int(os.getenv('JOURNAL_COMPACT_BYTES', str(1024 * 1024)))
+JOURNAL_COMPACT_INTERVAL = int(os.getenv('JOURNAL_COMPACT_INTERVAL', '600'))
+JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', '0') == '1'
+
+# Storage backend for user_data, cooldowns and roblox_data: "json" (default) or "sqlite"
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+SQLITE_DATA_FILE = os.getenv('SQLITE_DATA_FILE', 'bot_data.sqlite3')
+
+# How snapshots are taken: "thread" copies stores for the writer thread,
+# "fork" serializes from a forked child's copy-on-write view (Linux only)
+SNAPSHOT_MODE = os.getenv('SNAPSHOT_MODE', 'thread').lower()
+if SNAPSHOT_MODE == "fork" and not hasattr(os, "fork"):
+    print("⚠️ SNAPSHOT_MODE=fork needs os.fork, falling back to thread snapshots")
+    SNAPSHOT_MODE = "thread"
+
+# Snapshot encoding for user_data, cooldowns, roblox_data and invite_data: "json" or "binary"
+SNAPSHOT_FORMAT = os.getenv('SNAPSHOT_FORMAT', 'json').lower()
+
+# Split user_data into this many files by user-id hash so a flush only rewrites
+# the shards whose accounts changed; 1 keeps the single user_data file
+USER_DATA_SHARDS = max(1, int(os.getenv('USER_DATA_SHARDS', '1')))
+if USER_DATA_SHARDS > 1 and STORAGE_BACKEND == "sqlite":
+    print("⚠️ USER_DATA_SHARDS has no effect with the SQLite backend")
+    USER_DATA_SHARDS = 1
+
+# Hot/cold account tiering (JSON backend only): keep at most HOT_ACCOUNTS_MAX accounts
+# in memory and move accounts idle for COLD_ACCOUNT_IDLE_DAYS into compressed cold
+# buckets that are faulted back in on access; 0 disables either limit
+HOT_ACCOUNTS_MAX = int(os.getenv('HOT_ACCOUNTS_MAX', '0'))
+COLD_ACCOUNT_IDLE_DAYS = float(os.getenv('COLD_ACCOUNT_IDLE_DAYS', '0'))
+ACCOUNT_TIERING = HOT_ACCOUNTS_MAX > 0 or COLD_ACCOUNT_IDLE_DAYS > 0
+if ACCOUNT_TIERING and STORAGE_BACKEND == "sqlite":
+    print("⚠️ Account tiering has no effect with the SQLite backend")
+    ACCOUNT_TIERING = False
+COLD_ACCOUNTS_FILE = 'cold_accounts.bin'
+
+# Display names and avatars of Discord users, kept for PROFILE_TTL seconds and for at
+# most PROFILE_CACHE_MAX users (least recently used dropped first)
+PROFILE_CACHE_MAX = int(os.getenv('PROFILE_CACHE_MAX', '50000'))
+PROFILE_TTL = float(os.getenv('PROFILE_TTL', str(24 * 3600)))
+
+# Anti-spam rule "messages/seconds": more than that many messages inside the window
+# is spam. Message times are kept in memory only, for the SPAM_TRACKED_USERS most
+# recently active users
+SPAM_RULE = os.getenv('SPAM_RULE', '5/10')
+SPAM_MAX_MESSAGES, SPAM_WINDOW = int(SPAM_RULE.split("/")[0]), float(SPAM_RULE.split("/")[1])
+SPAM_TRACKED_USERS = int(os.getenv('SPAM_TRACKED_USERS', '10000'))
+
+# Duplicate-content rule "copies/seconds": from that many near-identical messages
+# inside the window (from anyone), further copies earn no chat reward. Messages
+# shorter than DUPLICATE_MIN_CHARS letters/digits ("gg", "lol") are never counted
+DUPLICATE_RULE = os.getenv('DUPLICATE_RULE', '3/60')
+DUPLICATE_MAX_COPIES, DUPLICATE_WINDOW = int(DUPLICATE_RULE.split("/")[0]), float(DUPLICATE_RULE.split("/")[1])
+DUPLICATE_MIN_CHARS = int(os.getenv('DUPLICATE_MIN_CHARS', '12'))
+
+# Write-behind: maximum delay between a save request and the disk flush
+SAVE_LATENCY = float(os.getenv('SAVE_LATENCY', '0.25'))
+
+# Persisted stores: name -> (file path, getter for the current object)
+PERSISTED_STORES = {
+    "user_data": (USER_DATA_FILE, lambda: user_data),
+    "shop_data": (SHOP_DATA_FILE, lambda: shop_data),
+    "cooldowns": (COOLDOWNS_FILE, lambda: cooldowns.deadlines),
+    "active_giveaways": (GIVEAWAYS_FILE, lambda: active_giveaways),
+    "giveaway_daily_totals": (DAILY_GIVEAWAYS_FILE, lambda: giveaway_daily_totals),
+    "coinflip_config": (COINFLIP_CONFIG_FILE, lambda: coinflip_config),
+    "mines_config": (MINES_CONFIG_FILE, lambda: mines_config),
+    "invite_data": (INVITE_DATA_FILE, lambda: invite_data),
+    "roblox_data": (ROBLOX_DATA_FILE, lambda: roblox_data),
+    "cold_accounts": (COLD_ACCOUNTS_FILE, lambda: cold_accounts),
+    "user_profiles": (USER_PROFILES_FILE, lambda: user_directory.profiles),
+}
+
+# Sharded layout: user_data is persisted as user_data.s0.json ... user_data.sN.json
+if USER_DATA_SHARDS > 1:
+    del PERSISTED_STORES["user_data"]
+    user_data_base, user_data_ext = os.path.splitext(USER_DATA_FILE)
+    for shard in range(USER_DATA_SHARDS):
+        PERSISTED_STORES[f"user_data.{shard}"] = (f"{user_data_base}.s{shard}{user_data_ext}", lambda shard=shard: shard_accounts(shard))
+
+USER_DATA_STORES = [name for name in PERSISTED_STORES if name == "user_data" or name.startswith("user_data.")]
+
+# Account ids in each shard, so a shard snapshot never scans every account
+user_shard_members = [set() for _ in range(USER_DATA_SHARDS)]
+
+# Stores changed since the last save, and the size each file had when last written
+current_manifest = {"generation": 0, "stores": {}}
+dirty_stores = set()
+saved_sizes = {}
+save_stats = {
+    "saves": 0,
+    "files_written": 0,
+    "files_skipped": 0,
+    "bytes_written": 0,
+    "bytes_skipped": 0,
+    "loop_block_ms": 0.0,
+    "loop_block_max_ms": 0.0,
+    "encode_ms": 0.0,
+    "encode_max_ms": 0.0
+}
+loop_lag_stats = {"last_ms": 0.0, "max_ms": 0.0}
+bgsave_stats = {
+    "runs": 0,
+    "failures": 0,
+    "last_ms": 0.0,
+    "max_ms": 0.0,
+    "fork_ms": 0.0,
+    "child_private_kb": 0,
+    "parent_rss_growth_kb": 0
+}
+
+# Snapshots are encoded and written on this thread, never on the event loop
+snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+
+# Set once load_data has run, so reconnects don't reload over live data
+data_loaded = False
+load_stats = {"total_ms": 0.0, "stores_ms": {}}
 
 WORK_JOBS = [
     "worked as a cashier at the supermarket", "stocked shelves at the grocery store", 
@@ -338,132 +480,654 @@ CRIME_ACTIVITIES = [
     "used expired coupon"
 ]
 
-async def load_data():
-    """Load all data from files"""
-    global user_data, shop_data, cooldowns, active_giveaways, giveaway_daily_totals
-    global coinflip_config, mines_config, invite_data, user_message_times, roblox_data
+# ===== ACCOUNTS =====
+
+class Account:
+    """A member's token account; user_data maps int user ids to these"""
+    
+    __slots__ = ("balance", "total_earned", "total_spent")
     
+    def __init__(self, balance=0, total_earned=0, total_spent=0):
+        self.balance = balance
+        self.total_earned = total_earned
+        self.total_spent = total_spent
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build an account from its JSON form"""
+        return cls(data.get('balance', 0), data.get('total_earned', 0), data.get('total_spent', 0))
+    
+    def to_dict(self):
+        """JSON form, as stored in user_data.json"""
+        return {'balance': self.balance, 'total_earned': self.total_earned, 'total_spent': self.total_spent}
+    
+    def copy(self):
+        return Account(self.balance, self.total_earned, self.total_spent)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Account):
+            return NotImplemented
+        return (self.balance, self.total_earned, self.total_spent) == (other.balance, other.total_earned, other.total_spent)
+    
+    def __repr__(self):
+        return f"Account(balance={self.balance}, total_earned={self.total_earned}, total_spent={self.total_spent})"
+
+def accounts_from_json(data):
+    """Convert JSON user_data (string ids, dict accounts) to the in-memory layout"""
+    return {int(user_id): Account.from_dict(account) for user_id, account in data.items()}
+
+def accounts_to_json(accounts):
+    """Convert in-memory accounts back to the JSON user_data layout"""
+    return {str(user_id): account.to_dict() for user_id, account in accounts.items()}
+
+def benchmark_accounts(accounts=100000):
+    """Compare the memory of dict accounts under string ids with Account under int ids"""
+    import tracemalloc
+    for label, build in (
+        ("dict accounts, str ids", lambda: {str(10**17 + i): {'balance': 1000 + i, 'total_earned': 2000 + i, 'total_spent': 500 + i} for i in range(accounts)}),
+        ("Account, int ids", lambda: {10**17 + i: Account(1000 + i, 2000 + i, 500 + i) for i in range(accounts)}),
+    ):
+        tracemalloc.start()
+        store = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        started = time.perf_counter()
+        for user_id in store:
+            store[user_id]
+        lookup_ms = (time.perf_counter() - started) * 1000
+        print(f"{label:<24}{size / 1024 / 1024:>10.1f} MB{size / accounts:>10.0f} B/account{lookup_ms:>10.1f} ms lookups")
+        del store
+
+# ===== COOLDOWNS =====
+
+def default_cooldowns():
+    return {command_type: {} for command_type in COOLDOWN_SECONDS}
+
+def cooldown_deadlines(raw, now=None):
+    """Normalise stored cooldowns to {command: {int user id: epoch deadline}}, dropping expired ones.
+    
+    Older files hold the time of last use instead: an ISO datetime for the
+    hours-long cooldowns and a str(time.time()) for the short ones.
+    """
+    now = time.time() if now is None else now
+    result = {command_type: {} for command_type in COOLDOWN_SECONDS}
+    for command_type, users in raw.items():
+        seconds = COOLDOWN_SECONDS.get(command_type, 0)
+        deadlines = result.setdefault(command_type, {})
+        for user_id, value in users.items():
+            try:
+                if isinstance(value, int):
+                    deadline = value
+                elif "T" in value:
+                    deadline = math.ceil(datetime.fromisoformat(value).timestamp() + seconds)
+                else:
+                    deadline = math.ceil(float(value) + seconds)
+            except (TypeError, ValueError):
+                continue
+            if deadline > now:
+                deadlines[int(user_id)] = deadline
+    return result
+
+class CooldownStore:
+    """Cooldown deadlines as integer epoch seconds per (command, user).
+    
+    Expiry is driven by timer_wheel: each started cooldown schedules an
+    expire() call for its deadline instead of being found by a scan.
+    """
+    
+    def __init__(self, deadlines=None):
+        self.deadlines = deadlines if deadlines is not None else default_cooldowns()
+        self.expired = 0
+    
+    def deadline(self, command_type, user_id):
+        """Epoch second the cooldown ends, or None if there is none"""
+        return self.deadlines[command_type].get(user_id)
+    
+    def start(self, command_type, user_id, now=None):
+        """Start a cooldown for its configured length and return the deadline"""
+        deadline = math.ceil((time.time() if now is None else now) + COOLDOWN_SECONDS[command_type])
+        self.deadlines[command_type][user_id] = deadline
+        return deadline
+    
+    def expire(self, command_type, user_id, deadline):
+        """Drop a cooldown if it still ends at deadline; False if it was restarted or cleared"""
+        users = self.deadlines.get(command_type)
+        if users is None or users.get(user_id) != deadline:
+            return False
+        del users[user_id]
+        self.expired += 1
+        return True
+    
+    def entries(self):
+        """Yield (command, user, deadline) for every active cooldown"""
+        for command_type, users in self.deadlines.items():
+            for user_id, deadline in users.items():
+                yield command_type, user_id, deadline
+    
+    def clear(self):
+        for users in self.deadlines.values():
+            users.clear()
+    
+    def __len__(self):
+        return sum(len(users) for users in self.deadlines.values())
+
+cooldowns = CooldownStore()
+
+# ===== TIMER WHEEL =====
+TIMER_TICK = 1.0        # seconds per wheel tick
+TIMER_WHEEL_BITS = 6    # 64 slots per level
+TIMER_WHEEL_LEVELS = 4  # 64**4 ticks, about 194 days at one-second ticks
+
+class Timer:
+    __slots__ = ("tick", "kind", "key", "callback", "args", "active")
+    
+    def __init__(self, tick, kind, key, callback, args):
+        self.tick = tick
+        self.kind = kind
+        self.key = key
+        self.callback = callback
+        self.args = args
+        self.active = True
+
+class TimerWheel:
+    """Hierarchical timing wheel for every deadline the bot tracks.
+    
+    Timers are keyed by (kind, key) so scheduling the same key again replaces
+    the old timer. Level n holds slots of 64**n ticks; when the lower level
+    wraps, the next slot up is cascaded down, so schedule() and cancel() are
+    O(1) and a tick only touches the timers that are due. Cancelled timers
+    stay in their slot and are skipped when it comes up.
+    """
+    
+    def __init__(self, tick=TIMER_TICK):
+        self.tick = tick
+        self.mask = (1 << TIMER_WHEEL_BITS) - 1
+        self.current = int(time.time() / tick)
+        self.levels = [[[] for _ in range(self.mask + 1)] for _ in range(TIMER_WHEEL_LEVELS)]
+        self.overflow = []
+        self.timers = {}
+        self.pending = {}
+        self.fired = 0
+        self.errors = 0
+        self.task = None
+    
+    def schedule(self, kind, key, deadline, callback, *args):
+        """Call callback(*args) at the epoch deadline; coroutines are run as tasks"""
+        self.cancel(kind, key)
+        # Anything already due fires on the next tick
+        timer = Timer(max(math.ceil(deadline / self.tick), self.current + 1), kind, key, callback, args)
+        self.timers[(kind, key)] = timer
+        self.pending[kind] = self.pending.get(kind, 0) + 1
+        self.place(timer)
+        return timer
+    
+    def cancel(self, kind, key):
+        """Cancel a pending timer; returns False if there was none"""
+        timer = self.timers.pop((kind, key), None)
+        if timer is None:
+            return False
+        timer.active = False
+        self.pending[kind] -= 1
+        return True
+    
+    def cancel_kind(self, kind):
+        """Cancel every pending timer of one kind"""
+        for kind_key in [kind_key for kind_key in self.timers if kind_key[0] == kind]:
+            self.cancel(*kind_key)
+    
+    def place(self, timer):
+        for level in range(TIMER_WHEEL_LEVELS):
+            shift = TIMER_WHEEL_BITS * (level + 1)
+            if timer.tick >> shift == self.current >> shift:
+                self.levels[level][(timer.tick >> (TIMER_WHEEL_BITS * level)) & self.mask].append(timer)
+                return
+        self.overflow.append(timer)
+    
+    def advance(self):
+        """Move one tick forward, cascading higher levels and firing due timers"""
+        self.current += 1
+        top = 0
+        while top < TIMER_WHEEL_LEVELS and not self.current & ((1 << (TIMER_WHEEL_BITS * (top + 1))) - 1):
+            top += 1
+        if top == TIMER_WHEEL_LEVELS:
+            overflow, self.overflow = self.overflow, []
+            for timer in overflow:
+                if timer.active:
+                    self.place(timer)
+            top -= 1
+        for level in range(top, 0, -1):
+            index = (self.current >> (TIMER_WHEEL_BITS * level)) & self.mask
+            timers, self.levels[level][index] = self.levels[level][index], []
+            for timer in timers:
+                if timer.active:
+                    self.place(timer)
+        index = self.current & self.mask
+        due, self.levels[0][index] = self.levels[0][index], []
+        for timer in due:
+            if timer.active:
+                self.fire(timer)
+    
+    def fire(self, timer):
+        timer.active = False
+        if self.timers.get((timer.kind, timer.key)) is timer:
+            del self.timers[(timer.kind, timer.key)]
+        self.pending[timer.kind] -= 1
+        self.fired += 1
+        try:
+            result = timer.callback(*timer.args)
+            if asyncio.iscoroutine(result):
+                asyncio.create_task(result)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Error in {timer.kind} timer: {e}")
+    
+    async def run(self):
+        while True:
+            target = int(time.time() / self.tick)
+            while self.current < target:
+                self.advance()
+            await asyncio.sleep(max(0.0, (self.current + 1) * self.tick - time.time()))
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    def __len__(self):
+        return len(self.timers)
+
+timer_wheel = TimerWheel()
+
+# ===== SNAPSHOT FORMATS =====
+
+# Binary snapshot layout (little endian):
+#   header   magic "DRBS", u8 version, u8 store kind
+#   strings  u32 count, u32 byte length, then the UTF-8 strings joined by NUL
+#   records  u32 count, then fixed-width records for the store kind
+SNAPSHOT_MAGIC = b"DRBS"
+SNAPSHOT_VERSION = 1
+BINARY_STORES = ("user_data", "cooldowns", "roblox_data", "invite_data")
+# Header kinds: the opt-in stores above, then stores that are always binary
+SNAPSHOT_KINDS = BINARY_STORES + ("cold_accounts",)
+SNAPSHOT_HEADER = struct.Struct("<4sBB")
+COUNT = struct.Struct("<I")
+STRING_TABLE = struct.Struct("<II")
+ACCOUNT_RECORD = struct.Struct("<Qqqq")      # user id, balance, total_earned, total_spent
+ACCOUNT_ID = struct.Struct("<Q")             # leading user id of an ACCOUNT_RECORD, for searching packed records
+ROBLOX_RECORD = struct.Struct("<QI")         # user id, username string index
+COOLDOWN_RECORD = struct.Struct("<BBQq")     # command string index, value kind, user id, value
+INVITER_RECORD = struct.Struct("<QIqI")      # inviter id, total_invites, tokens_earned, invited count
+INVITED_ID = struct.Struct("<Q")
+CACHED_INVITE = struct.Struct("<Iq")         # invite code string index, uses
+COLD_BUCKET = struct.Struct("<HI")           # bucket index, blob length (blob follows)
+COOLDOWN_ISO = 0                             # value is a naive datetime, stored as microseconds since 1970
+COOLDOWN_FLOAT = 1                           # value is a str(time.time()), stored as the bits of a double
+COOLDOWN_DEADLINE = 2                        # value is an epoch deadline in seconds
+DOUBLE_BITS = struct.Struct("<d")
+EPOCH = datetime(1970, 1, 1)
+
+class StringTable:
+    """Deduplicated strings referenced by index from binary records"""
+    
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+    
+    def add(self, value):
+        if value not in self.index:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return self.index[value]
+    
+    def encode(self):
+        # One joined blob decodes with a single split instead of a slice per string
+        blob = "\0".join(self.strings).encode()
+        return STRING_TABLE.pack(len(self.strings), len(blob)) + blob
+
+def decode_strings(data, offset):
+    """Read a string table, returning the strings and the offset after it"""
+    count, length = STRING_TABLE.unpack_from(data, offset)
+    offset += STRING_TABLE.size
+    strings = data[offset:offset + length].decode().split("\0") if count else []
+    return strings, offset + length
+
+def encode_binary_snapshot(name, obj):
+    """Encode a store in the compact binary layout"""
+    strings = StringTable()
+    records = []
+    count = len(obj)
+    
+    if name == "user_data":
+        for user_id, account in obj.items():
+            records.append(ACCOUNT_RECORD.pack(user_id, account.balance, account.total_earned, account.total_spent))
+    elif name == "roblox_data":
+        for user_id, username in obj.items():
+            records.append(ROBLOX_RECORD.pack(int(user_id), strings.add(username)))
+    elif name == "cooldowns":
+        count = sum(len(users) for users in obj.values())
+        for command_type, users in obj.items():
+            command_index = strings.add(command_type)
+            records.extend(COOLDOWN_RECORD.pack(command_index, COOLDOWN_DEADLINE, user_id, deadline)
+                           for user_id, deadline in users.items())
+    elif name == "invite_data":
+        count = len(obj) - (1 if 'cached_invites' in obj else 0)
+        for inviter_id, stats in obj.items():
+            if inviter_id == "cached_invites":
+                continue
+            invited = stats['invited_users']
+            records.append(INVITER_RECORD.pack(int(inviter_id), stats['total_invites'], stats['tokens_earned'], len(invited)))
+            records.extend(INVITED_ID.pack(int(user_id)) for user_id in invited)
+        cached = obj.get('cached_invites', {})
+        records.append(COUNT.pack(len(cached)))
+        records.extend(CACHED_INVITE.pack(strings.add(code), uses) for code, uses in cached.items())
+    elif name == "cold_accounts":
+        for bucket, blob in obj.items():
+            records.append(COLD_BUCKET.pack(int(bucket), len(blob)))
+            records.append(blob)
+    
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_KINDS.index(name))
+    return b"".join([header, strings.encode(), COUNT.pack(count)] + records)
+
+def decode_binary_snapshot(data):
+    """Decode a binary snapshot back into the store's JSON-shaped object"""
+    magic, version, kind = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    name = SNAPSHOT_KINDS[kind]
+    strings, offset = decode_strings(data, SNAPSHOT_HEADER.size)
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    
+    if name == "user_data":
+        end = offset + count * ACCOUNT_RECORD.size
+        return {user_id: Account(balance, earned, spent) for user_id, balance, earned, spent in ACCOUNT_RECORD.iter_unpack(data[offset:end])}
+    
+    if name == "roblox_data":
+        end = offset + count * ROBLOX_RECORD.size
+        return {str(user_id): strings[index] for user_id, index in ROBLOX_RECORD.iter_unpack(data[offset:end])}
+    
+    if name == "cooldowns":
+        # Every command type is in the string table, including ones with no active cooldowns
+        result = {command_type: {} for command_type in strings}
+        end = offset + count * COOLDOWN_RECORD.size
+        users_by_index = [result[command_type] for command_type in strings]
+        for command_index, value_kind, user_id, value in COOLDOWN_RECORD.iter_unpack(data[offset:end]):
+            # Files written before epoch deadlines hold the time of last use
+            if value_kind == COOLDOWN_ISO:
+                value = (EPOCH + timedelta(microseconds=value)).isoformat()
+            elif value_kind == COOLDOWN_FLOAT:
+                value = str(DOUBLE_BITS.unpack(value.to_bytes(8, "little", signed=True))[0])
+            users_by_index[command_index][user_id] = value
+        return result
+    
+    if name == "cold_accounts":
+        buckets = {}
+        for _ in range(count):
+            bucket, length = COLD_BUCKET.unpack_from(data, offset)
+            offset += COLD_BUCKET.size
+            buckets[bucket] = data[offset:offset + length]
+            offset += length
+        return buckets
+    
+    result = {}
+    for _ in range(count):
+        inviter_id, total_invites, tokens_earned, invited_count = INVITER_RECORD.unpack_from(data, offset)
+        offset += INVITER_RECORD.size
+        invited = [str(user_id) for (user_id,) in INVITED_ID.iter_unpack(data[offset:offset + invited_count * INVITED_ID.size])]
+        offset += invited_count * INVITED_ID.size
+        result[str(inviter_id)] = {'invited_users': invited, 'total_invites': total_invites, 'tokens_earned': tokens_earned}
+    (cached_count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    if cached_count:
+        end = offset + cached_count * CACHED_INVITE.size
+        result['cached_invites'] = {strings[index]: uses for index, uses in CACHED_INVITE.iter_unpack(data[offset:end])}
+    return result
+
+def store_kind(name):
+    """Logical store behind a persisted one: every user_data shard is user_data"""
+    return "user_data" if name.startswith("user_data.") else name
+
+def encode_store(name, obj, snapshot_format=None):
+    """Serialize a store snapshot in the configured format"""
+    if name == "cold_accounts" or ((snapshot_format or SNAPSHOT_FORMAT) == "binary" and store_kind(name) in BINARY_STORES):
+        return encode_binary_snapshot(store_kind(name), obj)
+    if store_kind(name) == "user_data":
+        obj = accounts_to_json(obj)
+    return json.dumps(obj, indent=2).encode()
+
+def decode_store(data, name):
+    """Deserialize a snapshot file, whichever format it was written in"""
+    if data[:len(SNAPSHOT_MAGIC)] == SNAPSHOT_MAGIC:
+        result = decode_binary_snapshot(data)
+    elif store_kind(name) == "user_data":
+        return accounts_from_json(json.loads(data))
+    else:
+        result = json.loads(data)
+    if name == "cooldowns":
+        result = cooldown_deadlines(result)
+    return result
+
+# Fresh value and log label for each persisted store
+STORE_DEFAULTS = {
+    "user_data": (dict, "user data"),
+    "shop_data": (list, "shop items"),
+    "cooldowns": (default_cooldowns, "cooldowns"),
+    "active_giveaways": (dict, "active giveaways"),
+    "giveaway_daily_totals": (dict, "daily giveaway totals"),
+    "coinflip_config": (lambda: {"win_chance": 45, "max_bet": 1000}, "coinflip configuration"),
+    "mines_config": (lambda: {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000}, "mines configuration"),
+    "invite_data": (dict, "invite data"),
+    "roblox_data": (dict, "Roblox data"),
+    "cold_accounts": (dict, "cold account buckets"),
+    "user_profiles": (dict, "user profiles"),
+}
+if USER_DATA_SHARDS > 1:
+    del STORE_DEFAULTS["user_data"]
+    for shard in range(USER_DATA_SHARDS):
+        STORE_DEFAULTS[f"user_data.{shard}"] = (dict, f"user data shard {shard}")
+
+def read_manifest():
+    """Read the snapshot manifest, or None when data predates manifests"""
+    if not os.path.exists(DATA_MANIFEST_FILE):
+        return None
     try:
-        # Load user data
-        if os.path.exists(USER_DATA_FILE):
-            async with aiofiles.open(USER_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                user_data = json.loads(contents)
-                print(f"✅ Loaded user data for {len(user_data)} users")
-        else:
-            print("ℹ️ No user data file found, starting fresh")
-            user_data = {}
-            
-        # Load shop data
-        if os.path.exists(SHOP_DATA_FILE):
-            async with aiofiles.open(SHOP_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                shop_data = json.loads(contents)
-                print(f"✅ Loaded {len(shop_data)} shop items")
-        else:
-            print("ℹ️ No shop data file found, starting fresh")
-            shop_data = []
-            
-        # Load cooldowns
-        if os.path.exists(COOLDOWNS_FILE):
-            async with aiofiles.open(COOLDOWNS_FILE, 'r') as f:
-                contents = await f.read()
-                cooldowns = json.loads(contents)
-                print("✅ Loaded cooldown data")
-        else:
-            print("ℹ️ No cooldowns file found, starting fresh")
-            cooldowns = {
-                "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-                "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-                "roblox": {}, "doors": {}
-            }
-        
-        # Load active giveaways
-        if os.path.exists(GIVEAWAYS_FILE):
-            async with aiofiles.open(GIVEAWAYS_FILE, 'r') as f:
-                contents = await f.read()
-                active_giveaways = json.loads(contents)
-                print(f"✅ Loaded {len(active_giveaways)} active giveaways")
-        else:
-            print("ℹ️ No giveaways file found, starting fresh")
-            active_giveaways = {}
-            
-        # Load daily giveaway totals
-        if os.path.exists(DAILY_GIVEAWAYS_FILE):
-            async with aiofiles.open(DAILY_GIVEAWAYS_FILE, 'r') as f:
-                contents = await f.read()
-                giveaway_daily_totals = json.loads(contents)
-                print("✅ Loaded daily giveaway totals")
-        else:
-            print("ℹ️ No daily giveaways file found, starting fresh")
-            giveaway_daily_totals = {}
-            
-        # Load coinflip configuration
-        if os.path.exists(COINFLIP_CONFIG_FILE):
-            async with aiofiles.open(COINFLIP_CONFIG_FILE, 'r') as f:
-                contents = await f.read()
-                coinflip_config = json.loads(contents)
-                print("✅ Loaded coinflip configuration")
-        else:
-            print("ℹ️ No coinflip config file found, using defaults")
-            coinflip_config = {"win_chance": 45, "max_bet": 1000}
-            
-        # Load mines configuration
-        if os.path.exists(MINES_CONFIG_FILE):
-            async with aiofiles.open(MINES_CONFIG_FILE, 'r') as f:
-                contents = await f.read()
-                mines_config = json.loads(contents)
-                print("✅ Loaded mines configuration")
-        else:
-            print("ℹ️ No mines config file found, using defaults")
-            mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000}
-            
-        # Load invite data
-        if os.path.exists(INVITE_DATA_FILE):
-            async with aiofiles.open(INVITE_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                invite_data = json.loads(contents)
-                print(f"✅ Loaded invite data for {len(invite_data)} inviters")
-        else:
-            print("ℹ️ No invite data file found, starting fresh")
-            invite_data = {}
-            
-        # Load anti-spam data
-        if os.path.exists(ANTISPAM_DATA_FILE):
-            async with aiofiles.open(ANTISPAM_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                user_message_times = json.loads(contents)
-                print("✅ Loaded anti-spam data")
-        else:
-            print("ℹ️ No anti-spam data file found, starting fresh")
-            user_message_times = {}
-            
-        # Load Roblox data
-        if os.path.exists(ROBLOX_DATA_FILE):
-            async with aiofiles.open(ROBLOX_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                roblox_data = json.loads(contents)
-                print(f"✅ Loaded Roblox data for {len(roblox_data)} users")
-        else:
-            print("ℹ️ No Roblox data file found, starting fresh")
-            roblox_data = {}
-            
+        with open(DATA_MANIFEST_FILE, 'r') as f:
+            return json.load(f)
     except Exception as e:
-        print(f"⚠️ Error loading data: {e}")
-        user_data = {}
-        shop_data = []
-        cooldowns = {
-            "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-            "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-            "roblox": {}, "doors": {}
-        }
-        active_giveaways = {}
-        giveaway_daily_totals = {}
-        coinflip_config = {"win_chance": 45, "max_bet": 1000}
-        mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000}
-        invite_data = {}
-        user_message_times = {}
-        roblox_data = {}
+        print(f"⚠️ Could not read data manifest: {e}")
+        return None
+
+def iter_json_object(f, chunk_size=64 * 1024):
+    """Stream (key, value) pairs out of a top-level JSON object without reading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+    
+    def skip(expected):
+        # Skip whitespace, then consume one of the expected separators
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                char = buffer[pos]
+                if char not in expected:
+                    raise ValueError(f"Expected one of {expected!r}, found {char!r}")
+                pos += 1
+                return char
+            if eof:
+                raise ValueError("Unexpected end of JSON object")
+            fill()
+    
+    def value():
+        # A value can straddle the chunk boundary; read more until it decodes
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            try:
+                result, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and isinstance(result, (int, float)) and (end == len(buffer) or buffer[end] not in " \t\r\n,}]"):
+                # A number cut at the chunk boundary still decodes ("-1." → -1), so wait for its terminator
+                fill()
+                continue
+            pos = end
+            return result
+    
+    skip("{")
+    if skip('"}') == "}":
+        return
+    pos -= 1
+    while True:
+        key = value()
+        skip(":")
+        yield key, value()
+        if skip(",}") == "}":
+            return
+
+def read_store_file(name, path):
+    """Decode one snapshot file, streaming large JSON objects entry by entry"""
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC or store_kind(name) != "user_data":
+            f.seek(0)
+            return decode_store(f.read(), name)
+        f.seek(0)
+        # Only the finished dict is held, never the whole file as one string alongside it
+        with io.TextIOWrapper(f, encoding="utf-8") as text:
+            return {int(user_id): Account.from_dict(account) for user_id, account in iter_json_object(text)}
+
+def load_store(name, path):
+    """Load one store and time it; runs on a loader thread"""
+    started = time.perf_counter()
+    contents = read_store_file(name, path)
+    return contents, (time.perf_counter() - started) * 1000
+
+def legacy_store_paths():
+    """Store paths from before generation manifests; an unsharded user_data file is included when sharding is on"""
+    stores = {name: path for name, (path, _) in PERSISTED_STORES.items()}
+    if "user_data" not in stores and os.path.exists(USER_DATA_FILE):
+        stores["user_data"] = USER_DATA_FILE
+    return stores
+
+def load_generation(stores):
+    """Load every store from one generation's files concurrently; raises if any file is unreadable"""
+    loaded = {}
+    futures = {}
+    # user_data written under another shard layout is loaded too and merged by load_data
+    defaults = dict(STORE_DEFAULTS)
+    for name in stores:
+        if store_kind(name) == "user_data" and name not in defaults:
+            defaults[name] = (dict, f"user data ({name})")
+    
+    with ThreadPoolExecutor(max_workers=len(defaults), thread_name_prefix="snapshot-loader") as executor:
+        for name, (make_default, label) in defaults.items():
+            path = stores.get(name)
+            if name in storage.owned_stores or not path or not os.path.exists(path):
+                loaded[name] = make_default()
+                if name not in storage.owned_stores:
+                    print(f"ℹ️ No {label} found, starting fresh")
+                continue
+            futures[name] = executor.submit(load_store, name, path)
+        
+        timings = {}
+        for name, future in futures.items():
+            loaded[name], timings[name] = future.result()
+            print(f"✅ Loaded {defaults[name][1]} ({len(loaded[name])} entries) in {timings[name]:.1f} ms")
+    load_stats["stores_ms"] = timings
+    return loaded
+
+async def load_data():
+    """Load all data from the newest readable snapshot generation"""
+    global user_data, shop_data, cooldowns, active_giveaways, giveaway_daily_totals
+    global coinflip_config, mines_config, invite_data, roblox_data
+    global current_manifest, data_loaded, cold_accounts
+    
+    started = time.perf_counter()
+    manifest = read_manifest()
+    if manifest:
+        candidates = [(manifest["generation"], manifest["stores"])]
+        if manifest.get("previous"):
+            candidates.append((manifest["previous"]["generation"], manifest["previous"]["stores"]))
+    else:
+        # Files written before generation manifests existed
+        candidates = [(0, legacy_store_paths())]
+    
+    loaded = None
+    for generation, stores in candidates:
+        try:
+            loaded = load_generation(stores)
+            print(f"✅ Loaded data generation {generation}")
+            break
+        except Exception as e:
+            print(f"⚠️ Error loading data generation {generation}: {e}")
+    
+    if loaded is None:
+        # Nothing readable: run on defaults but leave the files alone for recovery
+        print("⚠️ No readable data generation, starting with defaults")
+        loaded = {name: make_default() for name, (make_default, _) in STORE_DEFAULTS.items()}
+        stores = manifest["stores"] if manifest else {}
+    
+    current_manifest = {"generation": manifest["generation"] if manifest else 0, "stores": dict(stores)}
+    
+    user_parts = [contents for name, contents in loaded.items() if store_kind(name) == "user_data"]
+    user_data = user_parts[0] if len(user_parts) == 1 else {user_id: account for part in user_parts for user_id, account in part.items()}
+    shop_data = loaded["shop_data"]
+    cooldowns = CooldownStore(loaded["cooldowns"])
+    active_giveaways = loaded["active_giveaways"]
+    giveaway_daily_totals = loaded["giveaway_daily_totals"]
+    coinflip_config = loaded["coinflip_config"]
+    mines_config = loaded["mines_config"]
+    invite_data = loaded["invite_data"]
+    roblox_data = loaded["roblox_data"]
+    cold_accounts = loaded["cold_accounts"]
+    user_directory.load(loaded["user_profiles"])
+    
+    if storage.owned_stores:
+        storage.start()
+        user_data = storage.load("user_data")
+        stored_cooldowns = storage.load("cooldowns")
+        cooldowns = CooldownStore(cooldown_deadlines(stored_cooldowns))
+        if len(cooldowns) != sum(len(users) for users in stored_cooldowns.values()):
+            # Drop rows that had already expired while the bot was down
+            storage.replace("cooldowns", cooldowns.deadlines)
+        roblox_data = storage.load("roblox_data")
+        print(f"✅ Loaded {len(user_data)} accounts from {storage.name} storage")
+    else:
+        replay_balance_journal(user_data)
+    rebuild_user_shards()
+    
+    # Memory now matches disk, so nothing needs rewriting until it changes
+    dirty_stores.clear()
+    
+    # Files from another shard layout: drop them and write the configured layout next save
+    stale = [name for name in current_manifest["stores"] if name not in PERSISTED_STORES]
+    for name in stale:
+        del current_manifest["stores"][name]
+    if any(store_kind(name) == "user_data" for name in stale):
+        print(f"ℹ️ Rewriting user data as {USER_DATA_SHARDS} shard(s)")
+        mark_dirty(*USER_DATA_STORES)
+    start_account_tiers()
+    rebuild_leaderboard_index()
+    schedule_loaded_timers()
+    for name, path in current_manifest["stores"].items():
+        saved_sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+    
+    data_loaded = True
+    load_stats["total_ms"] = (time.perf_counter() - started) * 1000
+    print(f"✅ Data loaded in {load_stats['total_ms']:.1f} ms")
 
 def parse_amount(amount_str):
     """Parse amount strings with k, m, b suffixes"""
@@ -493,74 +1157,553 @@ def parse_amount(amount_str):
         except ValueError:
             return None
 
-async def save_data():
-    """Save all data to files"""
+def mark_dirty(*stores):
+    """Flag stores as changed so the next save rewrites them"""
+    dirty_stores.update(stores)
+
+def user_shard(user_id):
+    """Shard index for an account id; crc32 keeps it stable across restarts"""
+    return zlib.crc32(str(user_id).encode()) % USER_DATA_SHARDS
+
+def shard_accounts(shard):
+    """The accounts persisted in one user_data shard"""
+    return {user_id: user_data[user_id] for user_id in user_shard_members[shard] if user_id in user_data}
+
+def rebuild_user_shards():
+    """Recompute shard membership after user_data is loaded or replaced"""
+    if USER_DATA_SHARDS == 1:
+        return
+    for members in user_shard_members:
+        members.clear()
+    for user_id in user_data:
+        user_shard_members[user_shard(user_id)].add(user_id)
+
+def store_generation_path(name, generation, snapshot_format=None):
+    """File holding one store's snapshot for a generation, e.g. user_data.g12.json or user_data.g12.bin"""
+    base, ext = os.path.splitext(PERSISTED_STORES[name][0])
+    if (snapshot_format or SNAPSHOT_FORMAT) == "binary" and store_kind(name) in BINARY_STORES:
+        ext = ".bin"
+    return f"{base}.g{generation}{ext}"
+
+def fsync_directory(path="."):
+    """Make renames inside a directory durable"""
     try:
-        # Save user data
-        async with aiofiles.open(USER_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(user_data, indent=2))
-        
-        # Save shop data
-        async with aiofiles.open(SHOP_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(shop_data, indent=2))
-        
-        # Save cooldowns
-        async with aiofiles.open(COOLDOWNS_FILE, 'w') as f:
-            await f.write(json.dumps(cooldowns, indent=2))
-            
-        # Save active giveaways
-        async with aiofiles.open(GIVEAWAYS_FILE, 'w') as f:
-            await f.write(json.dumps(active_giveaways, indent=2))
-            
-        # Save daily giveaway totals
-        async with aiofiles.open(DAILY_GIVEAWAYS_FILE, 'w') as f:
-            await f.write(json.dumps(giveaway_daily_totals, indent=2))
-            
-        # Save coinflip configuration
-        async with aiofiles.open(COINFLIP_CONFIG_FILE, 'w') as f:
-            await f.write(json.dumps(coinflip_config, indent=2))
-            
-        # Save mines configuration
-        async with aiofiles.open(MINES_CONFIG_FILE, 'w') as f:
-            await f.write(json.dumps(mines_config, indent=2))
-            
-        # Save invite data
-        async with aiofiles.open(INVITE_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(invite_data, indent=2))
-            
-        # Save anti-spam data
-        async with aiofiles.open(ANTISPAM_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(user_message_times, indent=2))
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_file_atomic(path, data):
+    """Write bytes to a temp file, fsync it and rename it into place"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def commit_manifest(manifest):
+    """Atomically switch loads over to a new snapshot generation"""
+    write_file_atomic(DATA_MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+    fsync_directory()
+
+def remove_stale_generations(manifest):
+    """Delete snapshot files no longer referenced by the current or previous generation"""
+    keep = set(manifest["stores"].values()) | set(manifest.get("previous", {}).get("stores", {}).values())
+    user_base = os.path.splitext(USER_DATA_FILE)[0]
+    # Anti-spam data is no longer persisted; its old generations get cleaned up here too
+    bases = {os.path.splitext(path)[0] for path, _ in PERSISTED_STORES.values()} | {user_base, os.path.splitext(ANTISPAM_DATA_FILE)[0]}
+    for filename in os.listdir("."):
+        # Either snapshot format (.json/.bin) and leftover .tmp files
+        base, separator, rest = filename.rpartition(".g")
+        if filename in keep or not separator or not rest.split(".")[0].isdigit():
+            continue
+        # user_data shards from any shard count, so changing the count cleans up too
+        if base in bases or (base.startswith(user_base + ".s") and base[len(user_base) + 2:].isdigit()):
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+def snapshot_store(name, obj):
+    """Detached copy of a store for the writer thread"""
+    if store_kind(name) == "user_data":
+        # Flat accounts: copying each slotted record beats a generic deep walk
+        return {user_id: account.copy() for user_id, account in obj.items()}
+    # Other stores are JSON-shaped, so marshal's C-level walk copies them exactly
+    return marshal.loads(marshal.dumps(obj))
+
+def write_generation(snapshots, generation, stores, previous):
+    """Encode and write one snapshot generation; runs on the snapshot writer thread"""
+    sizes = {}
+    encode_time = 0.0
+    for name, snapshot in snapshots.items():
+        started = time.perf_counter()
+        contents = encode_store(name, snapshot)
+        encode_time += time.perf_counter() - started
+        write_file_atomic(stores[name], contents)
+        sizes[name] = len(contents)
+    
+    # Nothing written above is visible to load_data until the manifest flips
+    manifest = {"generation": generation, "stores": stores, "previous": previous}
+    commit_manifest(manifest)
+    remove_stale_generations(manifest)
+    return sizes, encode_time
+
+def read_proc_kb(field, path="/proc/self/status"):
+    """Read a kB figure such as VmRSS from /proc, or 0 where unavailable"""
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+async def fork_snapshot(names, generation, stores, previous):
+    """BGSAVE: fork a child that writes the generation from its copy-on-write view"""
+    read_fd, write_fd = os.pipe()
+    rss_before = read_proc_kb("VmRSS")
+    started = time.perf_counter()
+    pid = os.fork()
+    
+    if pid == 0:
+        # Child: touch nothing shared with other threads (no print, no locks) and always _exit
+        status = 1
+        try:
+            os.close(read_fd)
+            snapshots = {name: PERSISTED_STORES[name][1]() for name in names}
+            sizes, encode_time = write_generation(snapshots, generation, stores, previous)
+            report = {
+                "sizes": sizes,
+                "encode_ms": encode_time * 1000,
+                "private_kb": read_proc_kb("Private_Dirty", "/proc/self/smaps_rollup")
+            }
+            os.write(write_fd, json.dumps(report).encode())
+            status = 0
+        finally:
+            os._exit(status)
+    
+    # Parent: keep serving while a worker thread waits for the child to exit
+    fork_ms = (time.perf_counter() - started) * 1000
+    os.close(write_fd)
+    try:
+        _, wait_status = await asyncio.get_running_loop().run_in_executor(None, os.waitpid, pid, 0)
+        output = os.read(read_fd, 1 << 16)
+    finally:
+        os.close(read_fd)
+    duration_ms = (time.perf_counter() - started) * 1000
+    
+    bgsave_stats["runs"] += 1
+    bgsave_stats["fork_ms"] = fork_ms
+    if os.waitstatus_to_exitcode(wait_status) != 0 or not output:
+        bgsave_stats["failures"] += 1
+        raise RuntimeError(f"snapshot child {pid} failed with status {wait_status}")
+    
+    report = json.loads(output)
+    bgsave_stats["last_ms"] = duration_ms
+    bgsave_stats["max_ms"] = max(bgsave_stats["max_ms"], duration_ms)
+    bgsave_stats["child_private_kb"] = report["private_kb"]
+    bgsave_stats["parent_rss_growth_kb"] = read_proc_kb("VmRSS") - rss_before
+    print(f"📸 Background snapshot took {duration_ms:.0f} ms (fork {fork_ms:.1f} ms, {report['private_kb']:,} kB copied-on-write)")
+    return report["sizes"], report["encode_ms"] / 1000
+
+async def save_data(force=False):
+    """Save changed stores as a new snapshot generation"""
+    global current_manifest
+    generation = current_manifest["generation"] + 1
+    stores = dict(current_manifest["stores"])
+    pending = []
+    try:
+        # Only the copy (or fork) happens on the event loop; encoding and I/O happen elsewhere
+        started = time.perf_counter()
+        for name, (path, get_store) in PERSISTED_STORES.items():
+            if name in storage.owned_stores:
+                continue
+            if not force and name not in dirty_stores:
+                save_stats["files_skipped"] += 1
+                save_stats["bytes_skipped"] += saved_sizes.get(name, 0)
+                continue
             
-        # Save Roblox data
-        async with aiofiles.open(ROBLOX_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(roblox_data, indent=2))
+            # Clear the flag now so changes made while the writer runs stay dirty
+            dirty_stores.discard(name)
+            pending.append(name)
+            stores[name] = store_generation_path(name, generation)
+        
+        if pending:
+            previous = {"generation": current_manifest["generation"], "stores": current_manifest["stores"]}
+            if SNAPSHOT_MODE == "fork":
+                sizes, encode_time = await fork_snapshot(pending, generation, stores, previous)
+                blocked_ms = bgsave_stats["fork_ms"]
+            else:
+                snapshots = {name: snapshot_store(name, PERSISTED_STORES[name][1]()) for name in pending}
+                blocked_ms = (time.perf_counter() - started) * 1000
+                sizes, encode_time = await asyncio.get_running_loop().run_in_executor(
+                    snapshot_executor, write_generation, snapshots, generation, stores, previous
+                )
+            save_stats["loop_block_ms"] = blocked_ms
+            save_stats["loop_block_max_ms"] = max(save_stats["loop_block_max_ms"], blocked_ms)
+            current_manifest = {"generation": generation, "stores": stores}
             
-        print("💾 Data saved successfully")
+            for name, size in sizes.items():
+                saved_sizes[name] = size
+                save_stats["bytes_written"] += size
+            save_stats["files_written"] += len(sizes)
+            save_stats["encode_ms"] = encode_time * 1000
+            save_stats["encode_max_ms"] = max(save_stats["encode_max_ms"], encode_time * 1000)
+        
+        save_stats["saves"] += 1
+        if pending:
+            print(f"💾 Data saved successfully (generation {generation}: {len(pending)} files written, {len(PERSISTED_STORES) - len(storage.owned_stores) - len(pending)} unchanged)")
         return True
     except Exception as e:
+        # The generation was never committed, so everything in it is still unsaved
+        dirty_stores.update(pending)
         print(f"⚠️ Error saving data: {e}")
         return False
 
+class SaveScheduler:
+    """Coalesces save requests from handlers into background flushes"""
+    
+    def __init__(self, latency):
+        self.latency = latency
+        self.pending = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.requests = 0
+        self.flushes = 0
+    
+    def start(self):
+        """Start the writer task if it is not already running"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    def request(self):
+        """Schedule a save within the latency bound and return immediately"""
+        self.requests += 1
+        self.pending.set()
+    
+    async def run(self):
+        """Writer loop: wait for a request, let the burst settle, then flush once"""
+        while True:
+            await self.pending.wait()
+            await asyncio.sleep(self.latency)
+            self.pending.clear()
+            await self.flush(now=True)
+    
+    async def flush(self, now=True):
+        """Write pending changes to disk, or just schedule them when now is False"""
+        if not now:
+            self.request()
+            return True
+        async with self.lock:
+            self.flushes += 1
+            return await save_data()
+
+save_scheduler = SaveScheduler(SAVE_LATENCY)
+STORAGE_FLUSH_TIMEOUT = 10
+
+async def shutdown():
+    """Save everything, then disconnect so bot.run returns"""
+    await force_save_on_exit()
+    await bot.close()
+
+def request_shutdown():
+    if not getattr(bot, "shutting_down", False):
+        bot.shutting_down = True
+        asyncio.create_task(shutdown())
+
+def install_signal_handlers():
+    """Handle SIGTERM/SIGINT on the running loop so the exit save can be awaited"""
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, request_shutdown)
+        except NotImplementedError:
+            print("⚠️ Signal handlers are not supported here; unsaved data may be lost on exit")
+            return
+
 async def force_save_on_exit():
     """Force save data when bot shuts down"""
     print("🔄 Bot shutting down, saving data...")
     try:
-        if await save_data():
+        await compact_balance_journal()
+        # Off the loop on a daemon thread with a timeout, so a stuck backend can't hang shutdown
+        loop = asyncio.get_running_loop()
+        flushed = asyncio.Event()
+        def flush_storage():
+            try:
+                storage.flush()
+            finally:
+                loop.call_soon_threadsafe(flushed.set)
+        threading.Thread(target=flush_storage, name="storage-flush", daemon=True).start()
+        try:
+            await asyncio.wait_for(flushed.wait(), STORAGE_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"❌ {storage.name} writes still pending after {STORAGE_FLUSH_TIMEOUT}s, exiting anyway")
+        if await save_scheduler.flush(now=True):
             print("💾 Data saved on exit")
         else:
             print("❌ Failed to save data on exit")
     except Exception as e:
         print(f"⚠️ Error saving on exit: {e}")
 
+# ===== REST SCHEDULER =====
+# Outbound Discord calls other than direct interaction replies go through
+# rest_scheduler, which releases them by priority inside per-route and global token
+# buckets. Each incoming interaction holds back global capacity for its replies, and
+# bulk traffic must leave REST_BULK_RESERVE tokens untouched, so command responses
+# keep their headroom while logs, DMs and progress edits wait
+REST_PRIORITIES = ("user", "bulk")  # dispatch order
+REST_GLOBAL_RATE = 50               # Discord's global limit, requests per second
+REST_INTERACTION_COST = 2           # global tokens held back per incoming interaction
+REST_BULK_RESERVE = 10
+REST_QUEUE_LIMITS = {"user": 100, "bulk": 500}
+# (requests, per seconds) by route kind, mirroring Discord's per-channel/per-user buckets
+REST_ROUTE_LIMITS = {"message": (5, 5.0), "edit": (5, 5.0), "dm": (5, 5.0)}
+REST_SCAN_DEPTH = 8                 # queued calls checked per class to get past a busy route
+REST_MAX_ROUTES = 1000              # idle route buckets are forgotten beyond this
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+    
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    def wait_time(self, now, keep=0):
+        """Seconds until a token can be taken while leaving keep tokens behind"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (keep + 1 - self.tokens) / self.rate)
+    
+    def take(self, count=1):
+        self.tokens -= count
+
+class RestCall:
+    __slots__ = ("route", "factory", "future", "coalesce_key", "queued_at")
+    
+    def __init__(self, route, factory, future, coalesce_key):
+        self.route = route
+        self.factory = factory
+        self.future = future
+        self.coalesce_key = coalesce_key
+        self.queued_at = time.monotonic()
+
+class RestScheduler:
+    def __init__(self):
+        self.queues = {priority: deque() for priority in REST_PRIORITIES}
+        self.routes = {}
+        self.global_bucket = TokenBucket(REST_GLOBAL_RATE, 1.0)
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.interactions = 0
+        self.stats = {priority: {"sent": 0, "shed": 0, "coalesced": 0, "wait_ms": 0.0} for priority in REST_PRIORITIES}
+    
+    def note_interaction(self):
+        """Hold back global capacity for an interaction's replies"""
+        self.global_bucket.wait_time(time.monotonic())
+        self.global_bucket.take(REST_INTERACTION_COST)
+        self.interactions += 1
+    
+    async def call(self, priority, route, factory, coalesce_key=None):
+        """Await factory() once priority and rate limits allow; None if the call was shed.
+        
+        route is (kind, resource id), e.g. ("message", channel id). A call with
+        the coalesce_key of one still queued replaces it, and the older call
+        returns None.
+        """
+        queue = self.queues[priority]
+        if coalesce_key is not None:
+            for queued in queue:
+                if queued.coalesce_key == coalesce_key:
+                    queue.remove(queued)
+                    queued.future.set_result(None)
+                    self.stats[priority]["coalesced"] += 1
+                    break
+        if len(queue) >= REST_QUEUE_LIMITS[priority]:
+            self.stats[priority]["shed"] += 1
+            return None
+        call = RestCall(route, factory, asyncio.get_running_loop().create_future(), coalesce_key)
+        queue.append(call)
+        self.wakeup.set()
+        return await call.future
+    
+    def route_bucket(self, route):
+        bucket = self.routes.get(route)
+        if bucket is None:
+            if len(self.routes) >= REST_MAX_ROUTES:
+                now = time.monotonic()
+                for idle in [key for key, old in self.routes.items() if old.wait_time(now, old.capacity - 1) == 0]:
+                    del self.routes[idle]
+            bucket = self.routes[route] = TokenBucket(*REST_ROUTE_LIMITS[route[0]])
+        return bucket
+    
+    def next_call(self, now):
+        """Pop the highest-priority call that can go now; otherwise return how long to wait"""
+        delay = None
+        for priority in REST_PRIORITIES:
+            queue = self.queues[priority]
+            if not queue:
+                continue
+            global_wait = self.global_bucket.wait_time(now, REST_BULK_RESERVE if priority == "bulk" else 0)
+            if global_wait:
+                delay = global_wait if delay is None else min(delay, global_wait)
+                continue
+            for index in range(min(len(queue), REST_SCAN_DEPTH)):
+                call = queue[index]
+                route_wait = self.route_bucket(call.route).wait_time(now)
+                if not route_wait:
+                    del queue[index]
+                    return priority, call, None
+                delay = route_wait if delay is None else min(delay, route_wait)
+        return None, None, delay
+    
+    async def execute(self, call):
+        try:
+            result = await call.factory()
+        except Exception as e:
+            if not call.future.done():
+                call.future.set_exception(e)
+        else:
+            if not call.future.done():
+                call.future.set_result(result)
+    
+    async def run(self):
+        while True:
+            now = time.monotonic()
+            priority, call, delay = self.next_call(now)
+            if call is not None:
+                self.route_bucket(call.route).take()
+                self.global_bucket.take()
+                self.stats[priority]["sent"] += 1
+                self.stats[priority]["wait_ms"] += (now - call.queued_at) * 1000
+                asyncio.create_task(self.execute(call))
+                continue
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+rest_scheduler = RestScheduler()
+
+# Log channel pipeline: log_action only queues an embed; a background task packs
+# queued embeds into messages of up to 10 and sends them when a batch is full or
+# the oldest has waited LOG_FLUSH_INTERVAL seconds
+LOG_QUEUE_MAX = 500
+LOG_FLUSH_INTERVAL = 2.0
+LOG_EMBEDS_PER_MESSAGE = 10
+LOG_MESSAGE_CHARS = 6000  # Discord's limit on the combined size of a message's embeds
+# Per-game logs that can be sampled once the queue is half full and dropped when it is full
+LOW_PRIORITY_LOG_ACTIONS = {"COINFLIP", "DOORS_GAME", "MINES", "DUEL"}
+LOW_PRIORITY_SAMPLE_RATE = 0.25
+
+class LogPipeline:
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.stats = {"queued": 0, "messages": 0, "embeds": 0, "sampled_out": 0, "dropped": 0, "rate_limited": 0}
+    
+    def submit(self, embed, low_priority=False):
+        """Queue an embed without waiting on Discord; returns False if it was shed"""
+        if low_priority and len(self.queue) >= LOG_QUEUE_MAX // 2 and random.random() >= LOW_PRIORITY_SAMPLE_RATE:
+            self.stats["sampled_out"] += 1
+            return False
+        if len(self.queue) >= LOG_QUEUE_MAX:
+            # Full: make room by dropping the oldest low-priority entry, else shed this one
+            victim = next((entry for entry in self.queue if entry[2]), None)
+            if low_priority or victim is None:
+                self.stats["dropped"] += 1
+                return False
+            self.queue.remove(victim)
+            self.stats["dropped"] += 1
+        self.queue.append((time.monotonic(), embed, low_priority))
+        self.stats["queued"] += 1
+        # The first entry starts the flush timer; a full batch goes out at once
+        if len(self.queue) == 1 or len(self.queue) >= LOG_EMBEDS_PER_MESSAGE:
+            self.wakeup.set()
+        return True
+    
+    def next_batch(self):
+        batch = []
+        size = 0
+        while self.queue and len(batch) < LOG_EMBEDS_PER_MESSAGE:
+            embed = self.queue[0][1]
+            if batch and size + len(embed) > LOG_MESSAGE_CHARS:
+                break
+            self.queue.popleft()
+            batch.append(embed)
+            size += len(embed)
+        return batch
+    
+    async def send_batch(self, channel, batch):
+        while True:
+            try:
+                if await rest_scheduler.call("bulk", ("message", channel.id), lambda: channel.send(embeds=batch)) is None:
+                    self.stats["dropped"] += len(batch)
+                    return
+                self.stats["messages"] += 1
+                self.stats["embeds"] += len(batch)
+                return
+            except discord.RateLimited as e:
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    print(f"⚠️ Error sending log: {e}")
+                    self.stats["dropped"] += len(batch)
+                    return
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+            self.stats["rate_limited"] += 1
+            await asyncio.sleep(retry_after)
+    
+    async def run(self):
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            # Wait for a full batch or for the oldest entry to reach the flush interval
+            wait = LOG_FLUSH_INTERVAL - (time.monotonic() - self.queue[0][0])
+            if len(self.queue) < LOG_EMBEDS_PER_MESSAGE and wait > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            channel = bot.get_channel(self.channel_id)
+            if not channel:
+                print(f"⚠️ Log channel {self.channel_id} not found!")
+                self.stats["dropped"] += len(self.queue)
+                self.queue.clear()
+                continue
+            try:
+                await self.send_batch(channel, self.next_batch())
+            except Exception as e:
+                print(f"⚠️ Error sending log: {e}")
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+log_pipeline = LogPipeline(LOG_CHANNEL_ID)
+
 async def log_action(action_type, title, description, color=0x0099ff, user=None, fields=None):
-    """Send log message to the log channel"""
+    """Queue a log message for the log channel"""
     try:
-        log_channel = bot.get_channel(LOG_CHANNEL_ID)
-        if not log_channel:
-            print(f"⚠️ Log channel {LOG_CHANNEL_ID} not found!")
-            return
-        
         embed = discord.Embed(
             title=title,
             description=description,
@@ -580,255 +1723,1382 @@ async def log_action(action_type, title, description, color=0x0099ff, user=None,
                 )
         
         embed.set_footer(text=f"Action: {action_type}")
-        await log_channel.send(embed=embed)
+        log_pipeline.submit(embed, low_priority=action_type in LOW_PRIORITY_LOG_ACTIONS)
         
     except Exception as e:
         print(f"⚠️ Error sending log: {e}")
 
+# Purchase/reward outbox: log_purchase appends a record here first, and a background
+# task delivers records to the purchase log channel, moving a byte cursor past them
+# once Discord accepts them. The file is truncated once everything is delivered
+PURCHASE_OUTBOX_FILE = 'purchase_outbox.log'
+PURCHASE_OUTBOX_CURSOR_FILE = 'purchase_outbox.cursor'
+OUTBOX_COMPACT_BYTES = 256 * 1024
+OUTBOX_RETRY_MAX = 60
+OUTBOX_DEDUPE_SCAN = 100  # recent purchase-log messages checked for already-delivered ids
+
+def purchase_embed(record):
+    """Purchase log embed for an outbox record; the footer carries its id for dedupe"""
+    item_type = record["type"]
+    embed = discord.Embed(
+        title="🛒 Purchase Made" if item_type == "shop" else "🎉 Reward Won",
+        color=0x00ff00 if item_type == "shop" else 0xFFD700,
+        timestamp=datetime.fromtimestamp(record["at"])
+    )
+    
+    embed.add_field(name="User", value=f"<@{record['user_id']}>", inline=True)
+    embed.add_field(name="Item", value=record["item"], inline=True)
+    embed.add_field(name="Quantity", value=str(record["quantity"]), inline=True)
+    embed.add_field(name="Total Cost", value=f"{record['price'] * record['quantity']:,} 🪙", inline=True)
+    embed.add_field(name="Unit Price", value=f"{record['price']:,} 🪙", inline=True)
+    
+    if item_type == "reward":
+        embed.add_field(name="Type", value="Chat Reward", inline=True)
+    
+    embed.set_author(name=record["user_name"], icon_url=record["avatar"])
+    embed.set_footer(text=f"Log ID: {record['id']}")
+    return embed
+
+class PurchaseOutbox:
+    """Append-only file of purchase/reward records plus a delivered-up-to cursor.
+    
+    A crash between a send and the cursor write means that batch is sent again
+    on restart, so the delivery task first collects the log ids already in
+    the channel's recent messages and skips those records.
+    """
+    
+    def __init__(self, path, cursor_path):
+        self.path = path
+        self.cursor_path = cursor_path
+        self.file = None
+        self.cursor = self.read_cursor()
+        self.delivered_ids = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.stats = {"committed": 0, "delivered": 0, "deduped": 0, "messages": 0, "failures": 0,
+                      "last_lag": 0.0, "max_lag": 0.0, "started": time.time()}
+    
+    def read_cursor(self):
+        try:
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+    
+    def write_cursor(self, offset):
+        temp_path = self.cursor_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+        os.replace(temp_path, self.cursor_path)
+        self.cursor = offset
+    
+    def commit(self, record):
+        """Durably append a record; delivery happens later"""
+        if self.file is None:
+            self.file = open(self.path, 'a+b')
+            # A torn last line from a crash would swallow the next record
+            if self.file.tell():
+                self.file.seek(-1, os.SEEK_END)
+                if self.file.read(1) != b"\n":
+                    self.file.write(b"\n")
+        self.file.write(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+        self.file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self.file.fileno())
+        self.stats["committed"] += 1
+        self.wakeup.set()
+    
+    def pending_bytes(self):
+        try:
+            return max(0, os.path.getsize(self.path) - self.cursor)
+        except OSError:
+            return 0
+    
+    def read_pending(self, limit):
+        """Up to limit undelivered records and the offset just past them"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return [], self.cursor
+        if self.cursor > size:
+            # Truncated by compaction after the cursor was last written
+            self.write_cursor(0)
+        records = []
+        offset = self.cursor
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(records) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    if line.strip():
+                        print(f"⚠️ Skipping unreadable purchase outbox record at byte {offset - len(line)}")
+        return records, offset
+    
+    def compact(self):
+        """Empty the file once everything in it has been delivered"""
+        if self.cursor < OUTBOX_COMPACT_BYTES or self.pending_bytes():
+            return
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        open(self.path, 'wb').close()
+        self.write_cursor(0)
+        self.delivered_ids.clear()
+    
+    async def scan_delivered(self, channel):
+        """Collect log ids already in the channel so a resend after a crash is skipped"""
+        try:
+            async for message in channel.history(limit=OUTBOX_DEDUPE_SCAN):
+                if message.author.id != bot.user.id:
+                    continue
+                for embed in message.embeds:
+                    footer = embed.footer.text or ""
+                    if footer.startswith("Log ID: "):
+                        self.delivered_ids.add(footer[len("Log ID: "):])
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not scan purchase log for delivered records: {e}")
+    
+    async def run(self):
+        backoff = 1
+        scanned = False
+        while True:
+            records, end = self.read_pending(LOG_EMBEDS_PER_MESSAGE)
+            if not records:
+                if end != self.cursor:
+                    self.write_cursor(end)
+                self.compact()
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            
+            channel = bot.get_channel(PURCHASE_LOG_CHANNEL_ID)
+            try:
+                if not channel:
+                    raise RuntimeError(f"Purchase log channel {PURCHASE_LOG_CHANNEL_ID} not found")
+                if not scanned:
+                    await self.scan_delivered(channel)
+                    scanned = True
+                fresh = [record for record in records if record["id"] not in self.delivered_ids]
+                if fresh:
+                    embeds = [purchase_embed(record) for record in fresh]
+                    if await rest_scheduler.call("bulk", ("message", channel.id), lambda: channel.send(embeds=embeds)) is None:
+                        raise RuntimeError("REST scheduler is saturated")
+            except discord.RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"⚠️ Error sending purchase log, retrying in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, OUTBOX_RETRY_MAX)
+                continue
+            
+            backoff = 1
+            now = time.time()
+            for record in fresh:
+                self.stats["last_lag"] = now - record["at"]
+                self.stats["max_lag"] = max(self.stats["max_lag"], self.stats["last_lag"])
+            self.stats["deduped"] += len(records) - len(fresh)
+            self.stats["delivered"] += len(fresh)
+            self.stats["messages"] += bool(fresh)
+            self.write_cursor(end)
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+purchase_outbox = PurchaseOutbox(PURCHASE_OUTBOX_FILE, PURCHASE_OUTBOX_CURSOR_FILE)
+
 async def log_purchase(user, item_name, price, quantity=1, item_type="shop"):
-    """Log purchase to purchase log channel"""
+    """Record a purchase or reward in the outbox for the purchase log channel"""
     try:
-        purchase_channel = bot.get_channel(PURCHASE_LOG_CHANNEL_ID)
-        if not purchase_channel:
-            print(f"⚠️ Purchase log channel {PURCHASE_LOG_CHANNEL_ID} not found!")
-            return
-        
-        embed = discord.Embed(
-            title="🛒 Purchase Made" if item_type == "shop" else "🎉 Reward Won",
-            color=0x00ff00 if item_type == "shop" else 0xFFD700,
-            timestamp=datetime.now()
-        )
-        
-        embed.add_field(name="User", value=user.mention, inline=True)
-        embed.add_field(name="Item", value=item_name, inline=True)
-        embed.add_field(name="Quantity", value=str(quantity), inline=True)
-        embed.add_field(name="Total Cost", value=f"{price * quantity:,} 🪙", inline=True)
-        embed.add_field(name="Unit Price", value=f"{price:,} 🪙", inline=True)
-        
-        if item_type == "reward":
-            embed.add_field(name="Type", value="Chat Reward", inline=True)
-        
-        embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
-        await purchase_channel.send(embed=embed)
-        
+        purchase_outbox.commit({
+            "id": os.urandom(6).hex(),
+            "at": time.time(),
+            "user_id": user.id,
+            "user_name": user.display_name,
+            "avatar": user.display_avatar.url,
+            "item": item_name,
+            "price": price,
+            "quantity": quantity,
+            "type": item_type,
+        })
+    except Exception as e:
+        print(f"⚠️ Error recording purchase log: {e}")
+
+# ===== BALANCE JOURNAL =====
+
+journal_file = None
+journal_seq = 0
+journal_compacting = False
+last_journal_compaction = time.time()
+journal_stats = {"appends": 0, "replayed": 0, "compactions": 0}
+
+def journal_append(user_id, delta, reason, account):
+    """Append one balance mutation to the journal before it is acknowledged"""
+    global journal_file, journal_seq
+    if journal_file is None:
+        journal_file = open(BALANCE_JOURNAL_FILE, 'a', encoding='utf-8')
+    
+    journal_seq += 1
+    # The resulting totals are recorded too, so replaying an entry twice is harmless
+    record = [journal_seq, user_id, delta, reason, account.balance, account.total_earned, account.total_spent]
+    journal_file.write(json.dumps(record, separators=(',', ':')) + "\n")
+    journal_file.flush()
+    if JOURNAL_FSYNC:
+        os.fsync(journal_file.fileno())
+    journal_stats["appends"] += 1
+    
+    if journal_file.tell() >= JOURNAL_COMPACT_BYTES and not journal_compacting:
+        asyncio.create_task(compact_balance_journal())
+
+def journal_reset():
+    """Record that all balances were wiped"""
+    journal_append("*", 0, "reset", Account())
+
+def replay_balance_journal(accounts):
+    """Apply journal entries written after the last user_data snapshot"""
+    global journal_seq
+    replayed = 0
+    for path in (BALANCE_JOURNAL_OLD_FILE, BALANCE_JOURNAL_FILE):
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    seq, user_id, delta, reason, balance, earned, spent = json.loads(line)
+                except (ValueError, TypeError):
+                    # A torn final line from a crash was never acknowledged
+                    continue
+                
+                journal_seq = max(journal_seq, seq)
+                if user_id == "*":
+                    if reason == "reset":
+                        accounts.clear()
+                    continue
+                
+                # Entries from before int ids carry the id as a string
+                accounts[int(user_id)] = Account(balance, earned, spent)
+                replayed += 1
+    
+    journal_stats["replayed"] = replayed
+    if replayed:
+        print(f"✅ Replayed {replayed} balance journal entries")
+
+async def compact_balance_journal():
+    """Fold the journal into a fresh user_data snapshot and drop the folded entries"""
+    global journal_file, journal_compacting, last_journal_compaction
+    if journal_compacting or "user_data" in storage.owned_stores:
+        return
+    journal_compacting = True
+    try:
+        # Rotate first: every entry in the old file is already in memory, so any
+        # snapshot taken after this point covers it. A leftover old file from a
+        # failed compaction is kept and retried instead of being overwritten.
+        if not os.path.exists(BALANCE_JOURNAL_OLD_FILE) and os.path.exists(BALANCE_JOURNAL_FILE):
+            if journal_file is not None:
+                journal_file.close()
+                journal_file = None
+            os.replace(BALANCE_JOURNAL_FILE, BALANCE_JOURNAL_OLD_FILE)
+            # Carry the sequence number over so it stays monotonic
+            journal_append("*", 0, "checkpoint", Account())
+        
+        if USER_DATA_SHARDS == 1:
+            mark_dirty("user_data")
+        # Shards are flagged as their accounts change, so only those are rewritten
+        if await save_scheduler.flush(now=True):
+            if os.path.exists(BALANCE_JOURNAL_OLD_FILE):
+                os.remove(BALANCE_JOURNAL_OLD_FILE)
+            journal_stats["compactions"] += 1
+            last_journal_compaction = time.time()
     except Exception as e:
-        print(f"⚠️ Error sending purchase log: {e}")
+        print(f"⚠️ Error compacting balance journal: {e}")
+    finally:
+        journal_compacting = False
+
+# ===== STORAGE BACKENDS =====
+
+COOLDOWN_TYPES = tuple(COOLDOWN_SECONDS)
+
+class JsonBackend:
+    """Default backend: stores live in memory and are written out by save_data"""
+    
+    name = "json"
+    owned_stores = ()
+    
+    def start(self):
+        pass
+    
+    def load(self, store):
+        return None
+    
+    def put_account(self, user_id, delta, reason, account):
+        journal_append(user_id, delta, reason, account)
+        if USER_DATA_SHARDS > 1:
+            # Shards are small enough to flush on change; unsharded user_data waits for compaction
+            shard = user_shard(user_id)
+            user_shard_members[shard].add(user_id)
+            mark_dirty(f"user_data.{shard}")
+    
+    def put_cooldown(self, command_type, user_id, value):
+        mark_dirty("cooldowns")
+    
+    def expire_cooldowns(self, entries):
+        mark_dirty("cooldowns")
+    
+    def put_roblox(self, user_id, username):
+        mark_dirty("roblox_data")
+    
+    def replace(self, store, contents):
+        if store == "user_data":
+            journal_reset()
+            rebuild_user_shards()
+            cold_accounts.clear()
+            hot_access.clear()
+            mark_dirty("cold_accounts")
+            mark_dirty(*USER_DATA_STORES)
+            return
+        mark_dirty(store)
+    
+    def flush(self):
+        return True
+    
+    def stats(self):
+        return "JSON files"
+
+class SqliteBackend:
+    """SQLite (WAL) backend for user_data, cooldowns and roblox_data.
+    
+    The in-memory dicts stay the read path; every write is queued to a
+    dedicated connection thread that commits whatever is pending as one
+    transaction using the same fixed statements. A failed transaction hands
+    the error to any query waiting on it and keeps its writes to retry.
+    """
+    
+    name = "sqlite"
+    owned_stores = ("user_data", "cooldowns", "roblox_data")
+    
+    UPSERT_ACCOUNT = ("INSERT INTO accounts (user_id, balance, total_earned, total_spent) VALUES (?, ?, ?, ?) "
+                      "ON CONFLICT(user_id) DO UPDATE SET balance = excluded.balance, "
+                      "total_earned = excluded.total_earned, total_spent = excluded.total_spent")
+    UPSERT_COOLDOWN = ("INSERT INTO cooldowns (command, user_id, value) VALUES (?, ?, ?) "
+                       "ON CONFLICT(command, user_id) DO UPDATE SET value = excluded.value")
+    UPSERT_ROBLOX = ("INSERT INTO roblox (user_id, username) VALUES (?, ?) "
+                     "ON CONFLICT(user_id) DO UPDATE SET username = excluded.username")
+    DELETE_COOLDOWN = "DELETE FROM cooldowns WHERE command = ? AND user_id = ?"
+    RETRY_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+    TABLES = {"user_data": "accounts", "cooldowns": "cooldowns", "roblox_data": "roblox"}
+    
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+        self.transactions = 0
+        self.rows = 0
+        self.failures = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Start the connection thread if it is not already running"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="sqlite-writer", daemon=True)
+            self.thread.start()
+    
+    def run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS accounts (user_id TEXT PRIMARY KEY, balance INTEGER NOT NULL, "
+                     "total_earned INTEGER NOT NULL, total_spent INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cooldowns (command TEXT NOT NULL, user_id TEXT NOT NULL, value, "
+                     "PRIMARY KEY (command, user_id))")
+        conn.execute("CREATE TABLE IF NOT EXISTS roblox (user_id TEXT PRIMARY KEY, username TEXT NOT NULL)")
+        conn.commit()
+        
+        retry = []  # writes from a failed transaction, committed ahead of anything newer
+        delay = self.RETRY_DELAY
+        while True:
+            batch = retry or [self.queue.get()]
+            retry = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            rows = 0
+            try:
+                with conn:
+                    for kind, statement, params, reply in batch:
+                        if kind == "exec":
+                            conn.execute(statement, params)
+                            rows += 1
+                        elif kind == "many":
+                            conn.executemany(statement, params)
+                            rows += len(params)
+                        elif kind == "query":
+                            reply["result"] = conn.execute(statement, params).fetchall()
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ SQLite batch failed, retrying it one statement at a time: {e}")
+                retry = self.run_singly(conn, batch)
+                if retry:
+                    print(f"⚠️ {len(retry)} SQLite writes hit a transient error, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.RETRY_MAX_DELAY)
+                else:
+                    delay = self.RETRY_DELAY
+                continue
+            
+            self.transactions += 1
+            self.rows += rows
+            delay = self.RETRY_DELAY
+            for kind, statement, params, reply in batch:
+                if reply is not None:
+                    reply["done"].set()
+    
+    def run_singly(self, conn, batch):
+        """Commit a failed batch statement by statement (row by row for executemany).
+        
+        Returns the writes to retry, which are those that hit an OperationalError
+        such as a locked database, plus everything queued after them so order is
+        kept. Any other error means the row can never be written, e.g. an integer
+        past 2**63, so it is logged and dropped instead of blocking every later write.
+        """
+        retry = []
+        for item in batch:
+            kind, statement, params, reply = item
+            if retry and kind != "query":
+                retry.append(item)
+                continue
+            try:
+                with conn:
+                    if kind == "query":
+                        reply["result"] = conn.execute(statement, params).fetchall()
+                    for row in ((params,) if kind == "exec" else params if kind == "many" else ()):
+                        try:
+                            conn.execute(statement, row)
+                            self.rows += 1
+                        except sqlite3.OperationalError:
+                            raise
+                        except Exception as e:
+                            self.dropped += 1
+                            print(f"❌ Dropping SQLite write that can never succeed: {statement.split(' (')[0]} {row!r:.200}: {e}")
+                self.transactions += 1
+            except Exception as e:
+                if kind != "query":
+                    retry.append(item)
+                    continue
+                reply["error"] = e
+            if reply is not None:
+                reply["done"].set()
+        return retry
+    
+    def submit(self, kind, statement, params=(), wait=False):
+        """Queue a statement for the connection thread, optionally waiting for it.
+        
+        A waited-on query raises the error its transaction failed with.
+        """
+        self.start()
+        reply = {"done": threading.Event(), "result": None, "error": None} if wait else None
+        self.queue.put((kind, statement, params, reply))
+        if wait:
+            reply["done"].wait()
+            if reply["error"] is not None:
+                raise reply["error"]
+            return reply["result"]
+    
+    def load(self, store):
+        rows = self.submit("query", f"SELECT * FROM {self.TABLES[store]}", wait=True)
+        if store == "user_data":
+            return {int(uid): Account(b, e, sp) for uid, b, e, sp in rows}
+        if store == "cooldowns":
+            result = {command_type: {} for command_type in COOLDOWN_TYPES}
+            for command_type, uid, value in rows:
+                result.setdefault(command_type, {})[uid] = value
+            return result
+        return {uid: username for uid, username in rows}
+    
+    def put_account(self, user_id, delta, reason, account):
+        # TEXT affinity stores int ids as their decimal string, matching older rows
+        self.submit("exec", self.UPSERT_ACCOUNT, (user_id, account.balance, account.total_earned, account.total_spent))
+    
+    def put_cooldown(self, command_type, user_id, value):
+        self.submit("exec", self.UPSERT_COOLDOWN, (command_type, user_id, value))
+    
+    def expire_cooldowns(self, entries):
+        self.submit("many", self.DELETE_COOLDOWN, entries)
+    
+    def put_roblox(self, user_id, username):
+        self.submit("exec", self.UPSERT_ROBLOX, (user_id, username))
+    
+    def replace(self, store, contents):
+        """Overwrite a whole table with the given in-memory store"""
+        if store not in self.owned_stores:
+            mark_dirty(store)
+            return
+        self.submit("exec", f"DELETE FROM {self.TABLES[store]}")
+        if store == "user_data":
+            rows = [(uid, a.balance, a.total_earned, a.total_spent) for uid, a in contents.items()]
+            self.submit("many", self.UPSERT_ACCOUNT, rows)
+        elif store == "cooldowns":
+            rows = [(command_type, uid, value) for command_type, users in contents.items() for uid, value in users.items()]
+            self.submit("many", self.UPSERT_COOLDOWN, rows)
+        else:
+            self.submit("many", self.UPSERT_ROBLOX, list(contents.items()))
+    
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self.submit("sync", "", wait=True)
+        return True
+    
+    def stats(self):
+        return (f"SQLite: {self.transactions:,} transactions, {self.rows:,} rows, {self.queue.qsize():,} queued, "
+                f"{self.failures:,} failed batches, {self.dropped:,} rows dropped")
+
+def migrate_json_to_sqlite(path=SQLITE_DATA_FILE):
+    """One-shot import of the JSON user_data, cooldowns and roblox_data files into SQLite"""
+    backend = SqliteBackend(path)
+    manifest = read_manifest()
+    stores = manifest["stores"] if manifest else legacy_store_paths()
+    for store in backend.owned_stores:
+        # user_data may be split across shard files
+        file_paths = [file_path for name, file_path in stores.items() if store_kind(name) == store]
+        if not any(os.path.exists(file_path) for file_path in file_paths):
+            print(f"ℹ️ No {store} files found, skipping")
+            continue
+        contents = {}
+        for file_path in file_paths:
+            with open(file_path, 'rb') as f:
+                contents.update(decode_store(f.read(), store))
+        if store == "user_data":
+            # Cold-tier accounts are plain accounts to SQLite; hot copies win
+            cold_path = stores.get("cold_accounts")
+            if cold_path and os.path.exists(cold_path):
+                with open(cold_path, 'rb') as f:
+                    for blob in decode_store(f.read(), "cold_accounts").values():
+                        for user_id, balance, earned, spent in ACCOUNT_RECORD.iter_unpack(zlib.decompress(blob[COUNT.size:])):
+                            contents.setdefault(user_id, Account(balance, earned, spent))
+            replay_balance_journal(contents)
+        backend.replace(store, contents)
+        print(f"✅ Migrated {len(contents)} {store} entries")
+    backend.flush()
+
+def current_snapshot_stores():
+    """Manifest generation and store paths on disk, falling back to the legacy filenames"""
+    manifest = read_manifest()
+    if manifest:
+        return manifest["generation"], manifest["stores"]
+    return 0, legacy_store_paths()
+
+def convert_snapshots(snapshot_format):
+    """Rewrite the binary-capable stores in another format as a new generation (bot must be stopped)"""
+    if snapshot_format not in ("json", "binary"):
+        print("❌ Format must be json or binary")
+        return
+    generation, stores = current_snapshot_stores()
+    new_stores = dict(stores)
+    snapshots = {}
+    for name, path in stores.items():
+        if store_kind(name) not in BINARY_STORES or not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            snapshots[name] = decode_store(f.read(), name)
+        new_stores[name] = store_generation_path(name, generation + 1, snapshot_format)
+    
+    for name, snapshot in snapshots.items():
+        contents = encode_store(name, snapshot, snapshot_format)
+        write_file_atomic(new_stores[name], contents)
+        print(f"✅ {stores[name]} → {new_stores[name]} ({len(contents):,} bytes)")
+    
+    manifest = {"generation": generation + 1, "stores": new_stores, "previous": {"generation": generation, "stores": stores}}
+    commit_manifest(manifest)
+    remove_stale_generations(manifest)
+    print(f"✅ Snapshot generation {generation + 1} written as {snapshot_format}")
+
+def benchmark_snapshots(accounts=100000):
+    """Compare JSON and binary encode/decode time and size on the current files, or synthetic data"""
+    _, stores = current_snapshot_stores()
+    samples = {}
+    for name, path in stores.items():
+        if store_kind(name) in BINARY_STORES and os.path.exists(path):
+            with open(path, 'rb') as f:
+                samples[name] = decode_store(f.read(), name)
+    if not any(samples.get(name) for name in samples if store_kind(name) == "user_data"):
+        print(f"ℹ️ No user data on disk, benchmarking {accounts:,} synthetic accounts")
+        deadline = int(time.time()) + 3600
+        samples["user_data"] = {10**17 + i: Account(i % 5000, i % 9000, i % 4000) for i in range(accounts)}
+        samples["cooldowns"] = cooldown_deadlines({
+            'daily': {10**17 + i: deadline for i in range(0, accounts, 2)},
+            'work': {10**17 + i: deadline for i in range(0, accounts, 3)},
+            'coinflip': {10**17 + i: deadline for i in range(0, accounts, 5)},
+        })
+        samples["roblox_data"] = {str(10**17 + i): f"player_{i}" for i in range(0, accounts, 4)}
+    
+    print(f"{'store':<14}{'format':<8}{'bytes':>14}{'encode ms':>12}{'decode ms':>12}")
+    for name, obj in samples.items():
+        for snapshot_format in ("json", "binary"):
+            started = time.perf_counter()
+            contents = encode_store(name, obj, snapshot_format)
+            encode_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            decoded = decode_store(contents, name)
+            decode_ms = (time.perf_counter() - started) * 1000
+            if decoded != obj:
+                print(f"⚠️ {name} did not round-trip through {snapshot_format}")
+            print(f"{name:<14}{snapshot_format:<8}{len(contents):>14,}{encode_ms:>12.1f}{decode_ms:>12.1f}")
+
+storage = SqliteBackend(SQLITE_DATA_FILE) if STORAGE_BACKEND == "sqlite" else JsonBackend()
+
+# ===== ACCOUNT TIERS =====
+
+# user_data is the hot tier. Cold accounts live in COLD_BUCKETS zlib-compressed
+# blobs of ACCOUNT_RECORDs (prefixed with their record count), keyed by id hash.
+# Faulting in leaves the cold copy behind and a hot account always wins over it;
+# stale copies are dropped the next time their bucket is rewritten.
+COLD_BUCKETS = 1024
+hot_access = OrderedDict()
+tier_stats = {"hits": 0, "faults": 0, "absent": 0, "evictions": 0}
+
+def cold_bucket(user_id):
+    """Cold bucket index for an account id"""
+    return zlib.crc32(str(user_id).encode()) % COLD_BUCKETS
+
+def read_cold_bucket(bucket):
+    """Decompress one cold bucket into account dicts"""
+    blob = cold_accounts.get(bucket)
+    if not blob:
+        return {}
+    records = zlib.decompress(blob[COUNT.size:])
+    return {user_id: Account(balance, earned, spent) for user_id, balance, earned, spent in ACCOUNT_RECORD.iter_unpack(records)}
+
+def write_cold_bucket(bucket, accounts):
+    """Recompress one cold bucket from account dicts"""
+    if not accounts:
+        cold_accounts.pop(bucket, None)
+        return
+    records = b"".join(ACCOUNT_RECORD.pack(user_id, account.balance, account.total_earned, account.total_spent)
+                       for user_id, account in accounts.items())
+    cold_accounts[bucket] = COUNT.pack(len(accounts)) + zlib.compress(records, 1)
+
+def find_cold_account(user_id):
+    """Look up one account in its cold bucket without decoding the rest"""
+    blob = cold_accounts.get(cold_bucket(user_id))
+    if not blob:
+        return None
+    records = zlib.decompress(blob[COUNT.size:])
+    key = ACCOUNT_ID.pack(user_id)
+    offset = records.find(key)
+    while offset != -1 and offset % ACCOUNT_RECORD.size:
+        offset = records.find(key, offset + 1)
+    if offset == -1:
+        return None
+    _, balance, earned, spent = ACCOUNT_RECORD.unpack_from(records, offset)
+    return Account(balance, earned, spent)
+
+def cold_account_count():
+    """Accounts in the cold tier, read from the bucket headers"""
+    return sum(COUNT.unpack_from(blob)[0] for blob in cold_accounts.values())
+
+def hot_account_stores(user_ids):
+    """Persisted stores holding these hot accounts"""
+    if USER_DATA_SHARDS == 1:
+        return {"user_data"}
+    return {f"user_data.{user_shard(user_id)}" for user_id in user_ids}
+
+def touch_account(user_id):
+    """Mark a hot account as just used, evicting if the hot set has overgrown"""
+    hot_access[user_id] = time.time()
+    hot_access.move_to_end(user_id)
+    # Evict in batches so a full hot set doesn't recompress a bucket on every new account
+    if HOT_ACCOUNTS_MAX and len(user_data) > HOT_ACCOUNTS_MAX * 1.1:
+        evict_cold_accounts()
+
+def fault_in_account(user_id):
+    """Move an account from its cold bucket back into the hot tier, or None if it has none"""
+    account = find_cold_account(user_id)
+    if account is None:
+        tier_stats["absent"] += 1
+        return None
+    user_data[user_id] = account
+    if USER_DATA_SHARDS > 1:
+        user_shard_members[user_shard(user_id)].add(user_id)
+    tier_stats["faults"] += 1
+    # The hot copy now has to reach disk; the cold copy can stay until its bucket is rewritten
+    mark_dirty(*hot_account_stores([user_id]))
+    return account
+
+def get_account(user_id):
+    """A user's Account, faulted in from the cold tier if needed; None if they have none"""
+    user_id = int(user_id)
+    account = user_data.get(user_id)
+    if not ACCOUNT_TIERING:
+        return account
+    if account is None:
+        account = fault_in_account(user_id)
+        if account is None:
+            return None
+    else:
+        tier_stats["hits"] += 1
+    touch_account(user_id)
+    return account
+
+def iter_accounts():
+    """Every (user id, account) pair across both tiers, without faulting anything in"""
+    yield from list(user_data.items())
+    for bucket in list(cold_accounts):
+        for user_id, account in read_cold_bucket(bucket).items():
+            if user_id not in user_data:
+                yield user_id, account
+
+def evict_cold_accounts():
+    """Move idle and least-recently-used accounts out of the hot tier"""
+    if not ACCOUNT_TIERING:
+        return 0
+    cutoff = time.time() - COLD_ACCOUNT_IDLE_DAYS * 86400 if COLD_ACCOUNT_IDLE_DAYS else None
+    evicted = {}
+    while hot_access:
+        user_id, last_used = next(iter(hot_access.items()))
+        over_limit = HOT_ACCOUNTS_MAX and len(user_data) > HOT_ACCOUNTS_MAX
+        idle = cutoff is not None and last_used < cutoff
+        if not over_limit and not idle:
+            break
+        hot_access.popitem(last=False)
+        account = user_data.pop(user_id, None)
+        if account is not None:
+            evicted.setdefault(cold_bucket(user_id), {})[user_id] = account
+            if USER_DATA_SHARDS > 1:
+                user_shard_members[user_shard(user_id)].discard(user_id)
+    
+    if not evicted:
+        return 0
+    # One decompress/recompress per touched bucket for the whole batch
+    for bucket, accounts in evicted.items():
+        merged = {user_id: account for user_id, account in read_cold_bucket(bucket).items() if user_id not in user_data}
+        merged.update(accounts)
+        write_cold_bucket(bucket, merged)
+    count = sum(len(accounts) for accounts in evicted.values())
+    tier_stats["evictions"] += count
+    mark_dirty("cold_accounts", *hot_account_stores(user_id for accounts in evicted.values() for user_id in accounts))
+    return count
+
+def start_account_tiers():
+    """Track the loaded hot set, or fold cold buckets back in when tiering is off"""
+    global cold_accounts
+    hot_access.clear()
+    if not ACCOUNT_TIERING:
+        if cold_accounts:
+            folded = 0
+            for bucket in list(cold_accounts):
+                for user_id, account in read_cold_bucket(bucket).items():
+                    if user_id not in user_data:
+                        user_data[user_id] = account
+                        folded += 1
+            cold_accounts = {}
+            rebuild_user_shards()
+            mark_dirty("cold_accounts", *USER_DATA_STORES)
+            if folded:
+                print(f"ℹ️ Account tiering is off, moved {folded} cold accounts back into memory")
+        return
+    # Recency isn't persisted, so loaded accounts start out equally fresh
+    now = time.time()
+    for user_id in user_data:
+        hot_access[user_id] = now
+    evicted = evict_cold_accounts()
+    print(f"✅ Account tiers: {len(user_data)} hot, {cold_account_count()} cold" + (f" ({evicted} evicted)" if evicted else ""))
+
+async def sweep_cold_accounts(interval=300):
+    """Periodically move idle accounts into the cold tier"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = evict_cold_accounts()
+            if evicted:
+                print(f"🧊 Moved {evicted} idle accounts to cold storage")
+                save_scheduler.request()
+        except Exception as e:
+            print(f"⚠️ Error sweeping cold accounts: {e}")
+
+# ===== LEADERBOARD INDEX =====
+# (minimum balance, rank) from lowest to highest; get_rank bisects the thresholds
+RANK_TIERS = [
+    (0, "🔵 Starter"), (1000, "🟢 Silver"), (5000, "🥉 Gold"), (10000, "🥈 Premium"),
+    (20000, "🥇 VIP"), (50000, "💎 Elite"), (100000, "🏆 Legendary"),
+]
+RANK_THRESHOLDS = [minimum for minimum, _ in RANK_TIERS[1:]]
+# Accounts in each rank tier, kept current by update_balance
+tier_counts = [0] * len(RANK_TIERS)
+
+SKIP_LIST_LEVELS = 24  # enough for 2**24 ranked users at p = 1/2
+
+class SkipNode:
+    __slots__ = ("key", "next", "width")
+    
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+class RankIndex:
+    """Indexable skip list of (-balance, user id) keys, richest first.
+    
+    Each link stores how many entries it skips, so insert, remove, rank()
+    and seeking to a position are all O(log n); a page is a seek plus a walk.
+    """
+    
+    def __init__(self):
+        self.tail = SkipNode((math.inf, 0), 0)
+        self.head = SkipNode(None, SKIP_LIST_LEVELS)
+        self.head.next = [self.tail] * SKIP_LIST_LEVELS
+        self.size = 0
+    
+    def insert(self, key):
+        """Add a key and return its 0-based position"""
+        chain = [None] * SKIP_LIST_LEVELS
+        steps_at_level = [0] * SKIP_LIST_LEVELS
+        node = self.head
+        for level in range(SKIP_LIST_LEVELS - 1, -1, -1):
+            while node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        levels = 1
+        while levels < SKIP_LIST_LEVELS and random.random() < 0.5:
+            levels += 1
+        new_node = SkipNode(key, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, SKIP_LIST_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+        return sum(steps_at_level)
+    
+    def remove(self, key):
+        """Remove a key and return the position it had, or None if it was not indexed"""
+        chain = [None] * SKIP_LIST_LEVELS
+        position = 0
+        node = self.head
+        for level in range(SKIP_LIST_LEVELS - 1, -1, -1):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        target = node.next[0]
+        if target.key != key:
+            return None
+        levels = len(target.next)
+        for level in range(levels):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(levels, SKIP_LIST_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+        return position
+    
+    def rank(self, key):
+        """0-based position of key, or None if it is not indexed"""
+        position = 0
+        node = self.head
+        for level in range(SKIP_LIST_LEVELS - 1, -1, -1):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position if node.next[0].key == key else None
+    
+    def page(self, start, count):
+        """Up to count keys from position start onwards"""
+        if start >= self.size:
+            return []
+        node = self.head
+        remaining = start + 1
+        for level in range(SKIP_LIST_LEVELS - 1, -1, -1):
+            while node.width[level] <= remaining and node.next[level] is not self.tail:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not self.tail and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+    
+    def move(self, user_id, old_balance, new_balance):
+        """Re-rank a user after a balance change; only positive balances are ranked.
+        
+        Returns the (first, last) positions whose entries changed, or None.
+        """
+        if old_balance == new_balance:
+            return None
+        old_position = self.remove((-old_balance, user_id)) if old_balance > 0 else None
+        new_position = self.insert((-new_balance, user_id)) if new_balance > 0 else None
+        if old_position is None and new_position is None:
+            return None
+        if old_position is None or new_position is None:
+            # Joining or leaving shifts everyone below
+            return (new_position if old_position is None else old_position), math.inf
+        return min(old_position, new_position), max(old_position, new_position)
+    
+    def __len__(self):
+        return self.size
+
+leaderboard_index = RankIndex()
+
+# Rendered leaderboard pages: page -> (expires at, rankings text). A page is dropped
+# early only when a balance change moves an entry inside its range of positions
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_CACHE_TTL = 30
+LEADERBOARD_CACHE_PAGES = 100
+leaderboard_cache = {}
+leaderboard_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+leaderboard_version = 0  # bumped on every rank change, so renders that raced one aren't cached
+
+def invalidate_leaderboard_pages(first, last):
+    """Drop cached pages showing any position from first to last"""
+    global leaderboard_version
+    leaderboard_version += 1
+    for page in [page for page in leaderboard_cache
+                 if (page - 1) * LEADERBOARD_PAGE_SIZE <= last and page * LEADERBOARD_PAGE_SIZE > first]:
+        del leaderboard_cache[page]
+        leaderboard_cache_stats["invalidations"] += 1
+
+def rebuild_leaderboard_index():
+    """Index every account with tokens and count rank tiers, across both storage tiers"""
+    global leaderboard_index, leaderboard_version
+    leaderboard_index = RankIndex()
+    leaderboard_cache.clear()
+    leaderboard_version += 1
+    tier_counts[:] = [0] * len(RANK_TIERS)
+    for user_id, account in iter_accounts():
+        tier_counts[rank_tier(account.balance)] += 1
+        if account.balance > 0:
+            leaderboard_index.insert((-account.balance, user_id))
+
+# ===== USER DIRECTORY =====
+PROFILE_BATCH_DELAY = 0.05  # how long a miss waits for others to share its fetch
+QUERY_MEMBERS_LIMIT = 100   # user ids per gateway member query
+PROFILE_MISS_TTL = 300      # how long an id that resolved to nobody is not looked up again
+
+class UserDirectory:
+    """user id -> [display name, avatar URL, fetched at], LRU-ordered with a TTL.
+    
+    Lookups try the cache, then the gateway's user cache. Misses from any
+    number of concurrent resolve() calls are queued and fetched together: one
+    member query per 100 ids, then concurrent REST fetches for users not in a
+    guild. Ids that resolve to nobody are remembered for PROFILE_MISS_TTL.
+    """
+    
+    def __init__(self):
+        self.profiles = {}
+        self.missing = {}  # user id -> retry after, in expiry order
+        self.pending = {}
+        self.batch_task = None
+        self.stats = {"hits": 0, "misses": 0, "batches": 0, "queried": 0, "fetched": 0, "unknown": 0}
+    
+    def load(self, stored):
+        now = time.time()
+        self.profiles = {int(user_id): profile for user_id, profile in stored.items() if now - profile[2] < PROFILE_TTL}
+    
+    def remember(self, user):
+        """Store a discord.User or Member's name and avatar"""
+        profile = [user.display_name, user.display_avatar.url, time.time()]
+        old = self.profiles.pop(user.id, None)
+        self.profiles[user.id] = profile
+        while len(self.profiles) > PROFILE_CACHE_MAX:
+            del self.profiles[next(iter(self.profiles))]
+        # A refetch that only renews fetched_at rides along with the next real change
+        if old is None or old[:2] != profile[:2]:
+            mark_dirty("user_profiles")
+        return profile
+    
+    def refresh(self, user):
+        """Gateway update: refresh a user only if they are already cached"""
+        profile = self.profiles.get(user.id)
+        if profile and (profile[0], profile[1]) != (user.display_name, user.display_avatar.url):
+            self.remember(user)
+    
+    def get(self, user_id):
+        """Cached profile or None, without any network round trip"""
+        profile = self.profiles.get(user_id)
+        if profile is not None and time.time() - profile[2] < PROFILE_TTL:
+            self.stats["hits"] += 1
+            # Move to the most recently used end
+            self.profiles[user_id] = self.profiles.pop(user_id)
+            return profile
+        user = bot.get_user(user_id)
+        if user is not None:
+            self.stats["hits"] += 1
+            return self.remember(user)
+        return None
+    
+    def display_name(self, user_id):
+        profile = self.get(user_id)
+        return profile[0] if profile else f"<@{user_id}>"
+    
+    async def resolve(self, user_ids):
+        """Profiles for several users; ids that don't resolve to a user are left out"""
+        found = {}
+        waiting = []
+        now = time.time()
+        for user_id in map(int, user_ids):
+            profile = self.get(user_id)
+            if profile is not None:
+                found[user_id] = profile
+                continue
+            if self.missing.get(user_id, 0) > now:
+                continue
+            self.stats["misses"] += 1
+            future = self.pending.get(user_id)
+            if future is None:
+                future = self.pending[user_id] = asyncio.get_running_loop().create_future()
+            waiting.append((user_id, future))
+        if waiting and self.batch_task is None:
+            self.batch_task = asyncio.create_task(self.fetch_pending())
+        for user_id, future in waiting:
+            profile = await asyncio.shield(future)
+            if profile is not None:
+                found[user_id] = profile
+        return found
+    
+    async def fetch_pending(self):
+        await asyncio.sleep(PROFILE_BATCH_DELAY)
+        batch, self.pending = self.pending, {}
+        self.batch_task = None
+        self.stats["batches"] += 1
+        results = {}
+        try:
+            for guild in bot.guilds:
+                remaining = [user_id for user_id in batch if user_id not in results]
+                for i in range(0, len(remaining), QUERY_MEMBERS_LIMIT):
+                    try:
+                        members = await guild.query_members(user_ids=remaining[i:i + QUERY_MEMBERS_LIMIT], limit=QUERY_MEMBERS_LIMIT)
+                    except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException):
+                        continue
+                    self.stats["queried"] += 1
+                    for member in members:
+                        results[member.id] = self.remember(member)
+            unresolved = [user_id for user_id in batch if user_id not in results]
+            fetched = await asyncio.gather(*(bot.fetch_user(user_id) for user_id in unresolved), return_exceptions=True)
+            retry_after = time.time() + PROFILE_MISS_TTL
+            for user_id, user in zip(unresolved, fetched):
+                if isinstance(user, discord.User):
+                    results[user_id] = self.remember(user)
+                    self.stats["fetched"] += 1
+                else:
+                    self.missing.pop(user_id, None)
+                    self.missing[user_id] = retry_after
+                    self.stats["unknown"] += 1
+            while len(self.missing) > PROFILE_CACHE_MAX:
+                del self.missing[next(iter(self.missing))]
+        finally:
+            for user_id, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(user_id))
+    
+    def __len__(self):
+        return len(self.profiles)
+
+user_directory = UserDirectory()
 
 def get_user_balance(user_id):
     """Get user balance"""
-    return user_data.get(str(user_id), {}).get('balance', 0)
+    account = get_account(user_id)
+    return account.balance if account else 0
 
-def update_balance(user_id, amount):
-    """Update user balance"""
-    user_id = str(user_id)
-    if user_id not in user_data:
-        user_data[user_id] = {'balance': 0, 'total_earned': 0, 'total_spent': 0}
-    
-    user_data[user_id]['balance'] += amount
+def update_balance(user_id, amount, reason=""):
+    """Update user balance and journal the change"""
+    user_id = int(user_id)
+    account = get_account(user_id)
+    if account is None:
+        account = user_data[user_id] = Account()
+        tier_counts[0] += 1
+        if ACCOUNT_TIERING:
+            touch_account(user_id)
+    
+    old_tier, new_tier = rank_tier(account.balance), rank_tier(account.balance + amount)
+    if old_tier != new_tier:
+        tier_counts[old_tier] -= 1
+        tier_counts[new_tier] += 1
+    changed = leaderboard_index.move(user_id, account.balance, account.balance + amount)
+    if changed:
+        invalidate_leaderboard_pages(*changed)
+    account.balance += amount
     if amount > 0:
-        user_data[user_id]['total_earned'] = user_data[user_id].get('total_earned', 0) + amount
+        account.total_earned += amount
     else:
-        user_data[user_id]['total_spent'] = user_data[user_id].get('total_spent', 0) + abs(amount)
+        account.total_spent += abs(amount)
     
-    return user_data[user_id]['balance']
+    storage.put_account(user_id, amount, reason, account)
+    return account.balance
+
+def rank_tier(balance):
+    """Index into RANK_TIERS for a balance"""
+    return bisect_right(RANK_THRESHOLDS, balance)
 
 def get_rank(balance):
     """Get user rank"""
-    if balance >= 100000: return "🏆 Legendary"
-    elif balance >= 50000: return "💎 Elite"
-    elif balance >= 20000: return "🥇 VIP"
-    elif balance >= 10000: return "🥈 Premium"
-    elif balance >= 5000: return "🥉 Gold"
-    elif balance >= 1000: return "🟢 Silver"
-    else: return "🔵 Starter"
-
-def can_use_command(user_id, command_type, hours):
-    """Check if user can use command with persistent cooldowns"""
-    user_id = str(user_id)
-    if user_id not in cooldowns[command_type]:
-        return True, None
-    
-    try:
-        last_used = datetime.fromisoformat(cooldowns[command_type][user_id])
-        next_use = last_used + timedelta(hours=hours)
-        if datetime.now() >= next_use:
-            return True, None
-        return False, next_use
-    except:
+    return RANK_TIERS[rank_tier(balance)][1]
+
+def can_use_command(user_id, command_type):
+    """Check a cooldown; returns (True, None) or (False, epoch deadline)"""
+    deadline = cooldowns.deadline(command_type, int(user_id))
+    if deadline is None or deadline <= time.time():
         return True, None
+    return False, deadline
 
-def can_use_short_cooldown(user_id, command_type, seconds):
-    """Check short cooldowns"""
-    user_id = str(user_id)
-    if user_id not in cooldowns[command_type]:
-        return True
-    
-    try:
-        last_used = float(cooldowns[command_type][user_id])
-        if time.time() - last_used >= seconds:
-            return True
-        return False
-    except:
-        return True
+def can_use_short_cooldown(user_id, command_type):
+    """Check a cooldown that only needs a yes/no answer"""
+    return can_use_command(user_id, command_type)[0]
 
-def set_short_cooldown(user_id, command_type):
-    """Set short cooldown using timestamp"""
-    cooldowns[command_type][str(user_id)] = str(time.time())
+def set_cooldown(user_id, command_type):
+    """Start a cooldown for its configured length"""
+    user_id = int(user_id)
+    deadline = cooldowns.start(command_type, user_id)
+    storage.put_cooldown(command_type, user_id, deadline)
+    schedule_cooldown_expiry(command_type, user_id, deadline)
 
-def format_time(next_use):
-    """Format time remaining"""
-    try:
-        remaining = next_use - datetime.now()
-        hours = int(remaining.total_seconds() // 3600)
-        minutes = int((remaining.total_seconds() % 3600) // 60)
-        if hours > 0:
-            return f"{hours}h {minutes}m"
-        return f"{minutes}m"
-    except:
-        return "soon"
+def schedule_cooldown_expiry(command_type, user_id, deadline):
+    timer_wheel.schedule("cooldown", (command_type, user_id), deadline, expire_cooldown, command_type, user_id, deadline)
+
+def expire_cooldown(command_type, user_id, deadline):
+    """Timer callback: remove a cooldown from memory and storage once it ends"""
+    if cooldowns.expire(command_type, user_id, deadline):
+        storage.expire_cooldowns([(command_type, user_id)])
+        save_scheduler.request()
+
+def format_time(deadline):
+    """Format time remaining until an epoch deadline"""
+    remaining = max(0, deadline - time.time())
+    hours = int(remaining // 3600)
+    minutes = int((remaining % 3600) // 60)
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
 
 def is_admin(user):
     """Check if user is admin"""
     return any(role.id == ADMIN_ROLE_ID for role in user.roles)
 
+class MessageRing:
+    """Times of a user's last SPAM_MAX_MESSAGES messages; head is the oldest"""
+    __slots__ = ("times", "head")
+    
+    def __init__(self):
+        self.times = array('d', bytes(8 * SPAM_MAX_MESSAGES))
+        self.head = 0
+    
+    def reset(self):
+        for i in range(SPAM_MAX_MESSAGES):
+            self.times[i] = 0.0
+        self.head = 0
+
+# user id -> MessageRing, least recently active first; rings are recycled when full
+spam_windows = OrderedDict()
+spam_stats = {"checked": 0, "flagged": 0, "evictions": 0}
+
 def check_spam(user_id):
     """Check if user is spamming and deduct tokens if they are"""
     current_time = time.time()
-    user_id_str = str(user_id)
-    
-    if user_id_str not in user_message_times:
-        user_message_times[user_id_str] = []
+    spam_stats["checked"] += 1
     
-    # Remove timestamps older than 10 seconds
-    user_message_times[user_id_str] = [t for t in user_message_times[user_id_str] if current_time - t < 10]
+    ring = spam_windows.get(user_id)
+    if ring is not None:
+        spam_windows.move_to_end(user_id)
+    else:
+        if len(spam_windows) >= SPAM_TRACKED_USERS:
+            _, ring = spam_windows.popitem(last=False)
+            ring.reset()
+            spam_stats["evictions"] += 1
+        else:
+            ring = MessageRing()
+        spam_windows[user_id] = ring
     
-    # Add current timestamp
-    user_message_times[user_id_str].append(current_time)
+    # The slot being overwritten holds the message SPAM_MAX_MESSAGES before this one;
+    # if that is still inside the window, this message goes over the limit
+    oldest = ring.times[ring.head]
+    ring.times[ring.head] = current_time
+    ring.head = (ring.head + 1) % SPAM_MAX_MESSAGES
     
-    # Check if user has sent more than 5 messages in 10 seconds
-    if len(user_message_times[user_id_str]) > 5:
+    if current_time - oldest < SPAM_WINDOW:
+        spam_stats["flagged"] += 1
         # Deduct 50 tokens for spamming
         balance_before = get_user_balance(user_id)
         if balance_before >= 50:
-            new_balance = update_balance(user_id, -50)
-            asyncio.create_task(save_data())
+            new_balance = update_balance(user_id, -50, "spam_penalty")
+            save_scheduler.request()
             
             # Clear the message times to prevent multiple deductions
-            user_message_times[user_id_str] = []
+            ring.reset()
             
             return True, balance_before, new_balance
     
     return False, 0, 0
 
+SHINGLE_CHARS = 8         # length of the character k-grams that get hashed
+WINNOW_WINDOW = 4         # keep the smallest k-gram hash of every 4 in a row
+DUPLICATE_SHARE = 0.7     # share of a message's fingerprints that must already be common
+CONTENT_MAX_CHARS = 300   # long copypasta is still caught by its start
+SKETCH_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+SKETCH_DEPTH = len(SKETCH_SEEDS)
+SKETCH_WIDTH_BITS = 16    # 4 x 65536 16-bit counters: 512 KB per sketch
+MASK64 = (1 << 64) - 1
+
+def content_fingerprints(text):
+    """Winnowed k-gram hashes of the normalised text: copies share most of them despite small edits"""
+    hashes = [hash(text[i:i + SHINGLE_CHARS]) & MASK64 for i in range(len(text) - SHINGLE_CHARS + 1)]
+    if len(hashes) <= WINNOW_WINDOW:
+        return set(hashes)
+    return set(map(min, *(hashes[i:] for i in range(WINNOW_WINDOW))))
+
+def sketch_cells(key):
+    """The counter index of a key in each row of a CountMinSketch"""
+    return [(row << SKETCH_WIDTH_BITS) | (((key * seed) & MASK64) >> (64 - SKETCH_WIDTH_BITS))
+            for row, seed in enumerate(SKETCH_SEEDS)]
+
+class CountMinSketch:
+    """Fixed-size frequency estimates; never under-counts, over-counts only on collisions"""
+    __slots__ = ("counts",)
+    ZERO_BLOCK = array('H', bytes(2 * 4096))  # clear() zeroes counts in place, one block at a time
+    
+    def __init__(self):
+        self.counts = array('H', bytes(2 * SKETCH_DEPTH << SKETCH_WIDTH_BITS))
+    
+    def add(self, cells):
+        counts = self.counts
+        for cell in cells:
+            if counts[cell] < 0xFFFF:
+                counts[cell] += 1
+    
+    def estimate(self, cells):
+        return min(map(self.counts.__getitem__, cells))
+    
+    def clear(self):
+        counts, block = self.counts, self.ZERO_BLOCK
+        for start in range(0, len(counts), len(block)):
+            counts[start:start + len(block)] = block
+
+class DuplicateDetector:
+    """Counts near-identical messages over a sliding window with two rotating sketches.
+    
+    Each message is reduced to winnowed fingerprints of its character k-grams
+    and every fingerprint is counted in a count-min sketch. Copies share most
+    fingerprints even with a word added or changed, so a message counts as a
+    copy once DUPLICATE_SHARE of them have been seen DUPLICATE_MAX_COPIES times
+    over the current and previous window. Memory stays fixed however busy chat is.
+    """
+    
+    def __init__(self):
+        self.current = CountMinSketch()
+        self.previous = CountMinSketch()
+        self.window_start = time.time()
+        self.checked = 0
+        self.flagged = 0
+    
+    def rotate(self, now):
+        if now - self.window_start >= 2 * DUPLICATE_WINDOW:
+            self.previous.clear()
+            self.current.clear()
+            self.window_start = now
+        elif now - self.window_start >= DUPLICATE_WINDOW:
+            self.previous, self.current = self.current, self.previous
+            self.current.clear()
+            self.window_start += DUPLICATE_WINDOW
+    
+    def check(self, content, now=None):
+        """Record a message; True if it repeats content already seen DUPLICATE_MAX_COPIES times"""
+        text = " ".join(re.findall(r"\w+", content.lower()))[:CONTENT_MAX_CHARS]
+        if len(text) - text.count(" ") < DUPLICATE_MIN_CHARS:
+            return False
+        self.rotate(time.time() if now is None else now)
+        self.checked += 1
+        fingerprints = content_fingerprints(text)
+        common = 0
+        for key in fingerprints:
+            cells = sketch_cells(key)
+            if self.current.estimate(cells) + self.previous.estimate(cells) >= DUPLICATE_MAX_COPIES:
+                common += 1
+            self.current.add(cells)
+        if common >= DUPLICATE_SHARE * len(fingerprints):
+            self.flagged += 1
+            return True
+        return False
+
+duplicate_detector = DuplicateDetector()
+
 def has_linked_roblox(user_id):
     """Check if user has linked their Roblox account"""
     return str(user_id) in roblox_data
 
+def set_roblox_username(user_id, username):
+    """Link a Roblox username to a Discord user"""
+    roblox_data[str(user_id)] = username
+    storage.put_roblox(str(user_id), username)
+
+async def monitor_loop_lag(interval=0.5):
+    """Measure how late the event loop wakes up, i.e. how long something blocked it"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+        loop_lag_stats["last_ms"] = lag_ms
+        loop_lag_stats["max_ms"] = max(loop_lag_stats["max_ms"], lag_ms)
+
 # Auto-save task
 async def auto_save():
     """Auto save every 30 seconds"""
     while True:
         await asyncio.sleep(30)
-        await save_data()
-
-# Clean up expired duels
-async def cleanup_expired_duels():
-    """Clean up expired duel challenges"""
-    while True:
-        await asyncio.sleep(300)
-        current_time = datetime.now()
-        expired_duels = []
+        await save_scheduler.flush(now=True)
         
-        for duel_key, duel_data in pending_duels.items():
-            try:
-                created_at = duel_data['created_at']
-                if (current_time - created_at).total_seconds() > 300:
-                    expired_duels.append(duel_key)
-            except:
-                expired_duels.append(duel_key)
-        
-        for expired_key in expired_duels:
-            del pending_duels[expired_key]
+        if journal_stats["appends"] and time.time() - last_journal_compaction >= JOURNAL_COMPACT_INTERVAL:
+            await compact_balance_journal()
 
-# Clean up expired giveaways
-async def cleanup_expired_giveaways():
-    """Clean up expired giveaways"""
-    while True:
-        await asyncio.sleep(60)
-        current_time = datetime.now()
-        expired_giveaways = []
-        
-        for giveaway_id, giveaway_data in active_giveaways.items():
-            try:
-                end_time = datetime.fromisoformat(giveaway_data['end_time'])
-                if current_time >= end_time:
-                    expired_giveaways.append(giveaway_id)
-            except:
-                expired_giveaways.append(giveaway_id)
-        
-        for expired_id in expired_giveaways:
-            del active_giveaways[expired_id]
-            await save_data()
+# Expiry callbacks, run by timer_wheel at each entry's deadline
+DUEL_TIMEOUT = 300
+MINES_TIMEOUT = 300
 
-# Clean up expired mines games
-async def cleanup_expired_mines():
-    """Clean up expired mines games"""
-    while True:
-        await asyncio.sleep(60)
-        current_time = datetime.now()
-        expired_mines = []
-        
-        for game_id, game_data in active_mines_games.items():
-            try:
-                created_at = datetime.fromisoformat(game_data['created_at'])
-                if (current_time - created_at).total_seconds() > 300:
-                    expired_mines.append(game_id)
-            except:
-                expired_mines.append(game_id)
-        
-        for expired_id in expired_mines:
-            del active_mines_games[expired_id]
+def expire_duel(duel_key):
+    """Drop a duel challenge nobody answered"""
+    pending_duels.pop(duel_key, None)
 
-# Reset daily giveaway totals at midnight
-async def reset_daily_giveaway_totals():
-    """Reset daily giveaway totals at midnight"""
-    while True:
-        now = datetime.now()
-        next_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-        wait_seconds = (next_midnight - now).total_seconds()
-        
-        await asyncio.sleep(wait_seconds)
-        
+def expire_mines_game(game_id):
+    """Drop an abandoned mines game"""
+    active_mines_games.pop(game_id, None)
+
+def reset_daily_giveaway_totals():
+    """Reset daily giveaway totals at midnight and schedule the next reset"""
+    if giveaway_daily_totals:
         giveaway_daily_totals.clear()
-        await save_data()
+        mark_dirty("giveaway_daily_totals")
+        save_scheduler.request()
         print("🔄 Reset daily giveaway totals")
+    schedule_daily_giveaway_reset()
 
-# Clean up old anti-spam data
-async def cleanup_antispam_data():
-    """Clean up old anti-spam data"""
-    while True:
-        await asyncio.sleep(3600)
-        current_time = time.time()
-        
-        for user_id in list(user_message_times.keys()):
-            user_message_times[user_id] = [t for t in user_message_times[user_id] if current_time - t < 3600]
-            
-            if not user_message_times[user_id]:
-                del user_message_times[user_id]
-        
-        await save_data()
+def schedule_daily_giveaway_reset():
+    next_midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    timer_wheel.schedule("daily_reset", None, next_midnight.timestamp(), reset_daily_giveaway_totals)
 
-async def start_minigame():
-    """Start a minigame every 75 messages in the minigame channel"""
-    global active_minigame, minigame_message_count
-    await bot.wait_until_ready()
-    
-    while not bot.is_closed():
-        await asyncio.sleep(10)
-        
-        if minigame_message_count >= 75:
-            await trigger_minigame()
-            minigame_message_count = 0
+def schedule_loaded_timers():
+    """Register the deadlines of everything restored from disk"""
+    for command_type, user_id, deadline in cooldowns.entries():
+        schedule_cooldown_expiry(command_type, user_id, deadline)
+    for giveaway_id, giveaway in active_giveaways.items():
+        schedule_giveaway_timers(giveaway_id, giveaway)
+    if active_giveaways:
+        print(f"🎉 Resuming {len(active_giveaways)} giveaways")
+    print(f"⏲️ Scheduled {len(timer_wheel)} timers from saved data")
 
 async def trigger_minigame():
     """Force start a minigame"""
@@ -897,15 +3167,26 @@ async def trigger_minigame():
 @bot.event
 async def on_ready():
     print(f'🚀 {bot.user} is online!')
-    await load_data()
-    
+    if not data_loaded:
+        await load_data()
+    
+    save_scheduler.start()
+    if not getattr(bot, "signal_handlers_installed", False):
+        install_signal_handlers()
+        bot.signal_handlers_installed = True
+    if not getattr(bot, "loop_lag_task", None):
+        bot.loop_lag_task = asyncio.create_task(monitor_loop_lag())
     bot.auto_save_task = asyncio.create_task(auto_save())
-    bot.cleanup_task = asyncio.create_task(cleanup_expired_duels())
-    bot.giveaway_cleanup_task = asyncio.create_task(cleanup_expired_giveaways())
-    bot.mines_cleanup_task = asyncio.create_task(cleanup_expired_mines())
-    bot.daily_reset_task = asyncio.create_task(reset_daily_giveaway_totals())
-    bot.antispam_cleanup_task = asyncio.create_task(cleanup_antispam_data())
-    bot.minigame_task = asyncio.create_task(start_minigame())
+    schedule_daily_giveaway_reset()
+    if not getattr(bot, "giveaway_view_added", False):
+        bot.add_view(GiveawayEnterView())
+        bot.giveaway_view_added = True
+    timer_wheel.start()
+    rest_scheduler.start()
+    log_pipeline.start()
+    purchase_outbox.start()
+    if ACCOUNT_TIERING and not getattr(bot, "account_tier_task", None):
+        bot.account_tier_task = asyncio.create_task(sweep_cold_accounts())
     
     try:
         @bot.tree.error
@@ -939,22 +3220,27 @@ async def on_message(message):
                 embed.add_field(name="Old Balance", value=f"{old_balance:,} 🪙", inline=True)
                 embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=True)
                 embed.set_footer(text="Please wait between messages to avoid penalties")
-                await message.channel.send(embed=embed, delete_after=10)
+                await rest_scheduler.call("user", ("message", message.channel.id), lambda: message.channel.send(embed=embed, delete_after=10))
             except:
                 pass
         
-        # Award tokens for normal messages (if not spamming)
-        tokens = random.randint(1, 5)
-        update_balance(message.author.id, tokens)
+        # Award tokens for normal messages (if not spamming or copying a raid message)
+        if not duplicate_detector.check(message.content):
+            tokens = random.randint(1, 5)
+            update_balance(message.author.id, tokens, "chat")
         
         # Check if message is in minigame channel
         if message.channel.id == MINIGAME_CHANNEL_ID:
             minigame_message_count += 1
+            if minigame_message_count >= 75:
+                # Start a minigame every 75 messages in the minigame channel
+                minigame_message_count = 0
+                asyncio.create_task(trigger_minigame())
             
             # 2% chance to win huge pet reward when chatting in minigame channel
             if random.random() <= 0.02:  # 2% chance
                 huge_reward_name = random.choice(["Huge Hell Rock", "Huge Corgi", "Huge Cat", "Huge Dog", "Huge Dragon"])
-                await save_data()
+                save_scheduler.request()
                 
                 # Log the reward
                 await log_purchase(message.author, huge_reward_name, 0, 1, "reward")
@@ -982,8 +3268,8 @@ async def on_message(message):
                 active_minigame["active"] = False
                 
                 # Award tokens
-                update_balance(message.author.id, 200)
-                await save_data()
+                update_balance(message.author.id, 200, "minigame")
+                save_scheduler.request()
                 
                 embed = discord.Embed(
                     title="🎉 Minigame Winner!",
@@ -997,8 +3283,23 @@ async def on_message(message):
     
     await bot.process_commands(message)
 
+@bot.event
+async def on_interaction(interaction):
+    rest_scheduler.note_interaction()
+
+@bot.event
+async def on_member_update(before, after):
+    user_directory.refresh(after)
+
+@bot.event
+async def on_user_update(before, after):
+    # Prefer the member so a server nickname isn't replaced by the global name
+    member = next((member for guild in bot.guilds if (member := guild.get_member(after.id))), after)
+    user_directory.refresh(member)
+
 @bot.event
 async def on_member_join(member):
+    user_directory.remember(member)
     try:
         account_age = datetime.now().astimezone() - member.created_at
         if account_age.days < 30:
@@ -1040,14 +3341,15 @@ async def on_member_join(member):
             await send_invite_dm(used_invite.inviter, member, "Already tracked", "This member was already tracked.")
             return
         
-        update_balance(int(inviter_id), 300)
+        update_balance(int(inviter_id), 300, "invite")
         invite_data[inviter_id]['invited_users'].append(invited_id)
         invite_data[inviter_id]['total_invites'] += 1
         invite_data[inviter_id]['tokens_earned'] += 300
         
         invite_data['cached_invites'] = {invite.code: invite.uses for invite in invites}
+        mark_dirty("invite_data")
         
-        await save_data()
+        save_scheduler.request()
         
         await send_invite_dm(used_invite.inviter, member, "Reward given", "300 tokens")
         
@@ -1081,7 +3383,8 @@ async def send_invite_dm(inviter, member, status, message):
         
         embed.set_footer(text="IM's Universe")
         
-        await inviter.send(embed=embed)
+        if await rest_scheduler.call("bulk", ("dm", inviter.id), lambda: inviter.send(embed=embed)) is None:
+            print(f"⚠️ Dropped invite DM to {inviter}: REST scheduler is saturated")
     except Exception as e:
         print(f"⚠️ Could not DM {inviter} about invite: {e}")
 
@@ -1098,11 +3401,10 @@ async def balance(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    user_id = str(interaction.user.id)
-    balance = get_user_balance(interaction.user.id)
-    data = user_data.get(user_id, {})
-    earned = data.get('total_earned', 0)
-    spent = data.get('total_spent', 0)
+    account = get_account(interaction.user.id) or Account()
+    balance = account.balance
+    earned = account.total_earned
+    spent = account.total_spent
     rank = get_rank(balance)
     
     embed = discord.Embed(
@@ -1134,7 +3436,7 @@ async def daily(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    can_use, next_use = can_use_command(interaction.user.id, "daily", 24)
+    can_use, next_use = can_use_command(interaction.user.id, "daily")
     
     if not can_use:
         time_left = format_time(next_use)
@@ -1142,9 +3444,9 @@ async def daily(interaction: discord.Interaction):
         return
     
     tokens = random.randint(1, 50)
-    new_balance = update_balance(interaction.user.id, tokens)
-    cooldowns["daily"][str(interaction.user.id)] = datetime.now().isoformat()
-    await save_data()
+    new_balance = update_balance(interaction.user.id, tokens, "daily")
+    set_cooldown(interaction.user.id, "daily")
+    save_scheduler.request()
     
     embed = discord.Embed(title="🎁 Daily Reward!", color=0x00ff00)
     embed.add_field(name="Earned", value=f"{tokens:,} 🪙", inline=True)
@@ -1164,7 +3466,7 @@ async def work(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    can_use, next_use = can_use_command(interaction.user.id, "work", 3)
+    can_use, next_use = can_use_command(interaction.user.id, "work")
     
     if not can_use:
         time_left = format_time(next_use)
@@ -1173,9 +3475,9 @@ async def work(interaction: discord.Interaction):
     
     tokens = random.randint(1, 100)
     job = random.choice(WORK_JOBS)
-    new_balance = update_balance(interaction.user.id, tokens)
-    cooldowns["work"][str(interaction.user.id)] = datetime.now().isoformat()
-    await save_data()
+    new_balance = update_balance(interaction.user.id, tokens, "work")
+    set_cooldown(interaction.user.id, "work")
+    save_scheduler.request()
     
     embed = discord.Embed(title="💼 Work Complete!", color=0x4CAF50)
     embed.add_field(name="Job", value=f"You {job}", inline=False)
@@ -1196,7 +3498,7 @@ async def crime(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    can_use, next_use = can_use_command(interaction.user.id, "crime", 1)
+    can_use, next_use = can_use_command(interaction.user.id, "crime")
     
     if not can_use:
         time_left = format_time(next_use)
@@ -1208,7 +3510,7 @@ async def crime(interaction: discord.Interaction):
     
     if success:
         tokens = random.randint(1, 100)
-        new_balance = update_balance(interaction.user.id, tokens)
+        new_balance = update_balance(interaction.user.id, tokens, "crime")
         embed = discord.Embed(title="🎭 Crime Success!", color=0x00ff00)
         embed.add_field(name="Crime", value=f"You {activity}", inline=False)
         embed.add_field(name="Gained", value=f"+{tokens:,} 🪙", inline=True)
@@ -1216,7 +3518,7 @@ async def crime(interaction: discord.Interaction):
         tokens = random.randint(1, 200)
         current = get_user_balance(interaction.user.id)
         tokens = min(tokens, current)
-        new_balance = update_balance(interaction.user.id, -tokens)
+        new_balance = update_balance(interaction.user.id, -tokens, "crime")
         embed = discord.Embed(title="🚔 Crime Failed!", color=0xff4444)
         embed.add_field(name="Crime", value=f"Tried to {activity}", inline=False)
         embed.add_field(name="Lost", value=f"-{tokens:,} 🪙", inline=True)
@@ -1224,8 +3526,8 @@ async def crime(interaction: discord.Interaction):
     embed.add_field(name="Balance", value=f"{new_balance:,} 🪙", inline=True)
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
     
-    cooldowns["crime"][str(interaction.user.id)] = datetime.now().isoformat()
-    await save_data()
+    set_cooldown(interaction.user.id, "crime")
+    save_scheduler.request()
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -1242,7 +3544,7 @@ async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "coinflip", 5):
+    if not can_use_short_cooldown(interaction.user.id, "coinflip"):
         await interaction.response.send_message("⏰ Please wait 5 seconds between coinflips!", ephemeral=True)
         return
     
@@ -1282,13 +3584,13 @@ async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
     
     if won:
         winnings = parsed_amount
-        new_balance = update_balance(interaction.user.id, winnings)
+        new_balance = update_balance(interaction.user.id, winnings, "coinflip")
         embed = discord.Embed(title="🪙 Coinflip - YOU WON!", color=0x00ff00)
         embed.add_field(name="Your Choice", value=choice.title(), inline=True)
         embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
         embed.add_field(name="Winnings", value=f"+{winnings:,} 🪙", inline=True)
     else:
-        new_balance = update_balance(interaction.user.id, -parsed_amount)
+        new_balance = update_balance(interaction.user.id, -parsed_amount, "coinflip")
         embed = discord.Embed(title="🪙 Coinflip - YOU LOST!", color=0xff4444)
         embed.add_field(name="Your Choice", value=choice.title(), inline=True)
         embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
@@ -1297,8 +3599,8 @@ async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
     embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=False)
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
     
-    set_short_cooldown(interaction.user.id, "coinflip")
-    await save_data()
+    set_cooldown(interaction.user.id, "coinflip")
+    save_scheduler.request()
     
     await log_action(
         "COINFLIP",
@@ -1345,13 +3647,14 @@ class DuelAcceptView(discord.ui.View):
         duel_key = f"{self.challenger_id}_{self.challenged_id}"
         if duel_key in pending_duels:
             del pending_duels[duel_key]
+        timer_wheel.cancel("duel", duel_key)
         
         winner_id = random.choice([self.challenger_id, self.challenged_id])
         loser_id = self.challenged_id if winner_id == self.challenger_id else self.challenger_id
         
-        update_balance(winner_id, self.amount)
-        update_balance(loser_id, -self.amount)
-        await save_data()
+        update_balance(winner_id, self.amount, "duel")
+        update_balance(loser_id, -self.amount, "duel")
+        save_scheduler.request()
         
         winner = bot.get_user(winner_id)
         loser = bot.get_user(loser_id)
@@ -1393,6 +3696,7 @@ class DuelAcceptView(discord.ui.View):
         duel_key = f"{self.challenger_id}_{self.challenged_id}"
         if duel_key in pending_duels:
             del pending_duels[duel_key]
+        timer_wheel.cancel("duel", duel_key)
         
         challenger = bot.get_user(self.challenger_id)
         embed = discord.Embed(
@@ -1414,7 +3718,7 @@ async def duel(interaction: discord.Interaction, user: discord.Member, amount: s
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "duel", 10):
+    if not can_use_short_cooldown(interaction.user.id, "duel"):
         await interaction.response.send_message("⏰ Please wait 10 seconds between duel challenges!", ephemeral=True)
         return
     
@@ -1454,8 +3758,9 @@ async def duel(interaction: discord.Interaction, user: discord.Member, amount: s
         'amount': parsed_amount,
         'created_at': datetime.now()
     }
+    timer_wheel.schedule("duel", duel_key, time.time() + DUEL_TIMEOUT, expire_duel, duel_key)
     
-    set_short_cooldown(interaction.user.id, "duel")
+    set_cooldown(interaction.user.id, "duel")
     
     embed = discord.Embed(
         title="⚔️ Duel Challenge!",
@@ -1489,7 +3794,7 @@ async def gift(interaction: discord.Interaction, user: discord.Member, amount: s
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "gift", 3):
+    if not can_use_short_cooldown(interaction.user.id, "gift"):
         await interaction.response.send_message("⏰ Please wait 3 seconds between gifts!", ephemeral=True)
         return
     
@@ -1529,11 +3834,12 @@ async def gift(interaction: discord.Interaction, user: discord.Member, amount: s
         await interaction.response.send_message(f"❌ Need **{parsed_amount - giver_balance:,}** more tokens!", ephemeral=True)
         return
     
-    update_balance(interaction.user.id, -parsed_amount)
-    update_balance(user.id, parsed_amount)
+    update_balance(interaction.user.id, -parsed_amount, "gift")
+    update_balance(user.id, parsed_amount, "gift")
     giveaway_daily_totals[user_id][today] += parsed_amount
-    set_short_cooldown(interaction.user.id, "gift")
-    await save_data()
+    mark_dirty("giveaway_daily_totals")
+    set_cooldown(interaction.user.id, "gift")
+    save_scheduler.request()
     
     await log_action(
         "GIFT",
@@ -1574,8 +3880,8 @@ class PurchaseConfirmView(discord.ui.View):
             )
             return
         
-        new_balance = update_balance(interaction.user.id, -self.item['price'])
-        await save_data()
+        new_balance = update_balance(interaction.user.id, -self.item['price'], "shop")
+        save_scheduler.request()
         
         await log_purchase(interaction.user, self.item['name'], self.item['price'])
         
@@ -1695,7 +4001,7 @@ async def buy(interaction: discord.Interaction, item_name: str, quantity: int =
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "buy", 3):
+    if not can_use_short_cooldown(interaction.user.id, "buy"):
         await interaction.response.send_message("⏰ Please wait 3 seconds between purchases!", ephemeral=True)
         return
     
@@ -1730,9 +4036,9 @@ async def buy(interaction: discord.Interaction, item_name: str, quantity: int =
         )
         return
     
-    new_balance = update_balance(interaction.user.id, -total_cost)
-    set_short_cooldown(interaction.user.id, "buy")
-    await save_data()
+    new_balance = update_balance(interaction.user.id, -total_cost, "shop")
+    set_cooldown(interaction.user.id, "buy")
+    save_scheduler.request()
     
     await log_purchase(interaction.user, item['name'], item['price'], quantity)
     
@@ -1780,7 +4086,8 @@ class AddItemModal(discord.ui.Modal, title="Add Shop Item"):
         }
         
         shop_data.append(new_item)
-        await save_data()
+        mark_dirty("shop_data")
+        await save_scheduler.flush(now=True)
         
         await log_action(
             "SHOP_ADD",
@@ -1838,7 +4145,8 @@ class UpdateItemModal(discord.ui.Modal, title="Update Shop Item"):
         if self.description.value.strip():
             shop_data[item_idx]['description'] = self.description.value.strip()
         
-        await save_data()
+        mark_dirty("shop_data")
+        await save_scheduler.flush(now=True)
         
         await log_action(
             "SHOP_UPDATE",
@@ -1882,7 +4190,8 @@ class DeleteItemModal(discord.ui.Modal, title="Delete Shop Item"):
             return
         
         deleted_item = shop_data.pop(item_idx)
-        await save_data()
+        mark_dirty("shop_data")
+        await save_scheduler.flush(now=True)
         
         await log_action(
             "SHOP_DELETE",
@@ -1984,17 +4293,19 @@ class ResetConfirmView(discord.ui.View):
             await interaction.response.send_message("❌ Only the command user can confirm!", ephemeral=True)
             return
         
-        global user_data, cooldowns, invite_data, user_message_times, roblox_data
+        global user_data, invite_data, roblox_data
         user_data.clear()
-        cooldowns = {
-            "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-            "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-            "roblox": {}, "doors": {}
-        }
+        cooldowns.clear()
         invite_data.clear()
-        user_message_times.clear()
+        spam_windows.clear()
         roblox_data.clear()
-        await save_data()
+        timer_wheel.cancel_kind("cooldown")
+        for store, contents in (("user_data", user_data), ("cooldowns", cooldowns.deadlines), ("invite_data", invite_data),
+                                ("roblox_data", roblox_data)):
+            storage.replace(store, contents)
+        # Only after replace has dropped the cold tier, or its accounts stay ranked
+        rebuild_leaderboard_index()
+        await save_scheduler.flush(now=True)
         
         success_embed = discord.Embed(
             title="✅ Data Reset Complete",
@@ -2056,71 +4367,23 @@ async def resetdata(interaction: discord.Interaction, confirmation_code: str):
     view = ResetConfirmView(interaction.user.id)
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-@bot.tree.command(name="leaderboard", description="View the top token holders")
-async def leaderboard(interaction: discord.Interaction, page: int = 1):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    if not user_data:
-        embed = discord.Embed(
-            title="📊 Token Leaderboard",
-            description="No users have earned tokens yet!",
-            color=0x0099ff
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    sorted_users = []
-    for user_id, data in user_data.items():
-        balance = data.get('balance', 0)
-        if balance > 0:
-            try:
-                user = bot.get_user(int(user_id))
-                if user:
-                    sorted_users.append({
-                        'user': user,
-                        'balance': balance,
-                        'rank': get_rank(balance)
-                    })
-            except:
-                continue
-    
-    sorted_users.sort(key=lambda x: x['balance'], reverse=True)
-    
-    if not sorted_users:
-        embed = discord.Embed(
-            title="📊 Token Leaderboard",
-            description="No users with tokens found!",
-            color=0x0099ff
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    per_page = 10
-    max_pages = (len(sorted_users) + per_page - 1) // per_page
-    page = max(1, min(page, max_pages))
-    
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    page_users = sorted_users[start_idx:end_idx]
-    
-    embed = discord.Embed(
-        title="📊 Token Leaderboard",
-        color=0xFFD700,
-        timestamp=datetime.now()
-    )
-    
+async def leaderboard_page_text(page):
+    """Rankings text for one page, served from leaderboard_cache while it is fresh"""
+    now = time.time()
+    cached = leaderboard_cache.get(page)
+    if cached and cached[0] > now:
+        leaderboard_cache_stats["hits"] += 1
+        return cached[1]
+    leaderboard_cache_stats["misses"] += 1
+    
+    start_idx = (page - 1) * LEADERBOARD_PAGE_SIZE
+    entries = leaderboard_index.page(start_idx, LEADERBOARD_PAGE_SIZE)
+    version = leaderboard_version
+    profiles = await user_directory.resolve(user_id for _, user_id in entries)
     leaderboard_text = ""
-    for i, user_data_item in enumerate(page_users, start=start_idx + 1):
-        user = user_data_item['user']
-        balance = user_data_item['balance']
-        rank = user_data_item['rank']
+    for i, (negative_balance, user_id) in enumerate(entries, start=start_idx + 1):
+        balance = -negative_balance
+        name = profiles[user_id][0] if user_id in profiles else f"<@{user_id}>"
         
         if i == 1:
             medal = "🥇"
@@ -2131,18 +4394,38 @@ async def leaderboard(interaction: discord.Interaction, page: int = 1):
         else:
             medal = f"**{i}.**"
         
-        leaderboard_text += f"{medal} **{user.display_name}** - {balance:,} 🪙 {rank}\n"
+        leaderboard_text += f"{medal} **{name}** - {balance:,} 🪙 {get_rank(balance)}\n"
     
-    embed.add_field(name="Rankings", value=leaderboard_text, inline=False)
+    if version != leaderboard_version:
+        # Ranks moved while names were resolving; serve this render but don't keep it
+        return leaderboard_text
+    if page not in leaderboard_cache and len(leaderboard_cache) >= LEADERBOARD_CACHE_PAGES:
+        del leaderboard_cache[next(iter(leaderboard_cache))]
+    leaderboard_cache[page] = (now + LEADERBOARD_CACHE_TTL, leaderboard_text)
+    return leaderboard_text
+
+async def build_leaderboard_embed(viewer_id, page):
+    """Leaderboard embed for one page; returns (embed, page shown, page count)"""
+    total_users = len(leaderboard_index)
+    max_pages = max(1, (total_users + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE)
+    page = max(1, min(page, max_pages))
+    
+    start_idx = (page - 1) * LEADERBOARD_PAGE_SIZE
+    end_idx = start_idx + LEADERBOARD_PAGE_SIZE
+    
+    embed = discord.Embed(
+        title="📊 Token Leaderboard",
+        color=0xFFD700,
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="Rankings", value=await leaderboard_page_text(page) or "No users with tokens found!", inline=False)
     
-    user_position = None
-    for i, user_data_item in enumerate(sorted_users, 1):
-        if user_data_item['user'].id == interaction.user.id:
-            user_position = i
-            break
+    user_balance = get_user_balance(viewer_id)
+    user_position = leaderboard_index.rank((-user_balance, viewer_id))
+    if user_position is not None:
+        user_position += 1
     
     if user_position and (user_position < start_idx + 1 or user_position > end_idx):
-        user_balance = get_user_balance(interaction.user.id)
         user_rank = get_rank(user_balance)
         embed.add_field(
             name="Your Position",
@@ -2150,18 +4433,77 @@ async def leaderboard(interaction: discord.Interaction, page: int = 1):
             inline=False
         )
     
-    embed.set_footer(text=f"Page {page}/{max_pages} • {len(sorted_users)} total users")
+    embed.set_footer(text=f"Page {page}/{max_pages} • {total_users} total users")
+    return embed, page, max_pages
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, viewer_id, page, max_pages):
+        super().__init__(timeout=180)
+        self.viewer_id = viewer_id
+        self.page = page
+        self.update_buttons(max_pages)
+    
+    def update_buttons(self, max_pages):
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= max_pages
+    
+    async def show_page(self, interaction, page):
+        # Names missing from the directory may need a fetch, so acknowledge first
+        await interaction.response.defer()
+        embed, self.page, max_pages = await build_leaderboard_embed(self.viewer_id, page)
+        self.update_buttons(max_pages)
+        await interaction.edit_original_response(embed=embed, view=self)
+    
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page - 1)
+    
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page + 1)
+
+@bot.tree.command(name="leaderboard", description="View the top token holders")
+async def leaderboard(interaction: discord.Interaction, page: int = 1):
+    if not has_linked_roblox(interaction.user.id):
+        embed = discord.Embed(
+            title="🔗 Roblox Account Required",
+            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
+            color=0xff9900
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    if not user_data and not cold_accounts:
+        embed = discord.Embed(
+            title="📊 Token Leaderboard",
+            description="No users have earned tokens yet!",
+            color=0x0099ff
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    total_users = len(leaderboard_index)
+    if not total_users:
+        embed = discord.Embed(
+            title="📊 Token Leaderboard",
+            description="No users with tokens found!",
+            color=0x0099ff
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    embed, page, max_pages = await build_leaderboard_embed(interaction.user.id, page)
+    view = LeaderboardView(interaction.user.id, page, max_pages)
+    await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
 @bot.tree.command(name="adminbalance", description="Check user balance (Admin only)")
 @discord.app_commands.check(admin_check)
 async def adminbalance(interaction: discord.Interaction, user: discord.Member):
-    user_id = str(user.id)
-    balance = get_user_balance(user.id)
-    data = user_data.get(user_id, {})
-    earned = data.get('total_earned', 0)
-    spent = data.get('total_spent', 0)
+    account = get_account(user.id) or Account()
+    balance = account.balance
+    earned = account.total_earned
+    spent = account.total_spent
     rank = get_rank(balance)
     
     embed = discord.Embed(title=f"💰 {user.display_name}'s Wallet", color=0xFF6B6B)
@@ -2181,8 +4523,8 @@ async def addtoken(interaction: discord.Interaction, user: discord.Member, amoun
         await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
         return
     
-    new_balance = update_balance(user.id, parsed_amount)
-    await save_data()
+    new_balance = update_balance(user.id, parsed_amount, "admin_add")
+    await save_scheduler.flush(now=True)
     
     await log_action(
         "ADD_TOKENS",
@@ -2220,8 +4562,8 @@ async def removetoken(interaction: discord.Interaction, user: discord.Member, am
         )
         return
     
-    new_balance = update_balance(user.id, -parsed_amount)
-    await save_data()
+    new_balance = update_balance(user.id, -parsed_amount, "admin_remove")
+    await save_scheduler.flush(now=True)
     
     await log_action(
         "REMOVE_TOKENS",
@@ -2243,6 +4585,177 @@ async def removetoken(interaction: discord.Interaction, user: discord.Member, am
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="tierstats", description="View how many users are in each rank (Admin only)")
+@discord.app_commands.check(admin_check)
+async def tierstats(interaction: discord.Interaction):
+    total = sum(tier_counts)
+    embed = discord.Embed(title="🏅 Rank Distribution", color=0x0099ff, timestamp=datetime.now())
+    
+    distribution = ""
+    for (minimum, rank), count in reversed(list(zip(RANK_TIERS, tier_counts))):
+        share = count / total if total else 0
+        distribution += f"{rank} ({minimum:,}+ 🪙): **{count:,}** ({share:.1%})\n"
+    embed.add_field(name="Users per Rank", value=distribution, inline=False)
+    embed.set_footer(text=f"{total:,} accounts")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="botstats", description="View bot performance statistics (Admin only)")
+@discord.app_commands.check(admin_check)
+async def botstats(interaction: discord.Interaction):
+    embed = discord.Embed(title="📈 Bot Statistics", color=0x0099ff, timestamp=datetime.now())
+    
+    embed.add_field(
+        name="💾 Persistence",
+        value=(
+            f"**Saves:** {save_stats['saves']:,} ({SNAPSHOT_FORMAT} format)\n"
+            f"**Save Requests:** {save_scheduler.requests:,} → {save_scheduler.flushes:,} flushes\n"
+            f"**Files Written:** {save_stats['files_written']:,} ({save_stats['bytes_written']:,} bytes)\n"
+            f"**Files Skipped:** {save_stats['files_skipped']:,} ({save_stats['bytes_skipped']:,} bytes)\n"
+            f"**Dirty Now:** {', '.join(sorted(dirty_stores)) or 'None'}\n"
+            f"**Startup Load:** {load_stats['total_ms']:.1f} ms\n"
+            f"**Active Cooldowns:** {len(cooldowns):,} ({cooldowns.expired:,} expired and pruned)"
+        ),
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🛡️ Anti-Spam",
+        value=(
+            f"**Rule:** more than {SPAM_MAX_MESSAGES} messages in {SPAM_WINDOW:g}s\n"
+            f"**Messages Checked:** {spam_stats['checked']:,} ({spam_stats['flagged']:,} flagged)\n"
+            f"**Tracked Users:** {len(spam_windows):,} / {SPAM_TRACKED_USERS:,} ({spam_stats['evictions']:,} recycled)\n"
+            f"**Duplicate Content:** {duplicate_detector.flagged:,} of {duplicate_detector.checked:,} messages "
+            f"({DUPLICATE_MAX_COPIES}+ copies in {DUPLICATE_WINDOW:g}s earn no reward)"
+        ),
+        inline=False
+    )
+    
+    leaderboard_lookups = leaderboard_cache_stats["hits"] + leaderboard_cache_stats["misses"]
+    embed.add_field(
+        name="📊 Leaderboard",
+        value=(
+            f"**Ranked Users:** {len(leaderboard_index):,}\n"
+            f"**Page Cache:** {leaderboard_cache_stats['hits'] / leaderboard_lookups if leaderboard_lookups else 0:.0%} hit rate "
+            f"({leaderboard_cache_stats['hits']:,} hits, {leaderboard_cache_stats['misses']:,} misses)\n"
+            f"**Pages Invalidated:** {leaderboard_cache_stats['invalidations']:,} ({len(leaderboard_cache)} cached now)"
+        ),
+        inline=False
+    )
+    
+    profile_lookups = user_directory.stats["hits"] + user_directory.stats["misses"]
+    embed.add_field(
+        name="👤 User Directory",
+        value=(
+            f"**Cached Profiles:** {len(user_directory):,} / {PROFILE_CACHE_MAX:,}\n"
+            f"**Hit Rate:** {user_directory.stats['hits'] / profile_lookups if profile_lookups else 0:.0%} "
+            f"({user_directory.stats['misses']:,} misses)\n"
+            f"**Batches:** {user_directory.stats['batches']:,} ({user_directory.stats['queried']:,} member queries, "
+            f"{user_directory.stats['fetched']:,} REST fetches, {user_directory.stats['unknown']:,} unknown)"
+        ),
+        inline=False
+    )
+    
+    embed.add_field(
+        name="📝 Log Pipeline",
+        value=(
+            f"**Queued:** {len(log_pipeline.queue):,} now ({log_pipeline.stats['queued']:,} total)\n"
+            f"**Sent:** {log_pipeline.stats['embeds']:,} embeds in {log_pipeline.stats['messages']:,} messages\n"
+            f"**Shed:** {log_pipeline.stats['sampled_out']:,} sampled out, {log_pipeline.stats['dropped']:,} dropped\n"
+            f"**Rate Limited:** {log_pipeline.stats['rate_limited']:,} times"
+        ),
+        inline=False
+    )
+    
+    outbox_minutes = max(1.0, (time.time() - purchase_outbox.stats["started"]) / 60)
+    embed.add_field(
+        name="🧾 Purchase Outbox",
+        value=(
+            f"**Delivered:** {purchase_outbox.stats['delivered']:,} of {purchase_outbox.stats['committed']:,} committed "
+            f"({purchase_outbox.stats['delivered'] / outbox_minutes:.1f}/min, {purchase_outbox.stats['deduped']:,} deduped)\n"
+            f"**Backlog:** {purchase_outbox.pending_bytes():,} bytes\n"
+            f"**Lag:** {purchase_outbox.stats['last_lag']:.1f}s (max {purchase_outbox.stats['max_lag']:.1f}s)\n"
+            f"**Send Failures:** {purchase_outbox.stats['failures']:,}"
+        ),
+        inline=False
+    )
+    
+    rest_lines = []
+    for priority in REST_PRIORITIES:
+        stats = rest_scheduler.stats[priority]
+        average_wait = stats["wait_ms"] / stats["sent"] if stats["sent"] else 0
+        rest_lines.append(f"**{priority.title()}:** {len(rest_scheduler.queues[priority]):,} queued, {stats['sent']:,} sent, "
+                          f"{stats['shed']:,} shed, {stats['coalesced']:,} coalesced, {average_wait:.0f} ms avg wait")
+    embed.add_field(
+        name="🚦 REST Scheduler",
+        value="\n".join(rest_lines) + f"\n**Interactions:** {rest_scheduler.interactions:,} (served first)",
+        inline=False
+    )
+    
+    pending_timers = "\n".join(f"**{kind.replace('_', ' ').title()}:** {count:,}"
+                                for kind, count in sorted(timer_wheel.pending.items()) if count)
+    embed.add_field(
+        name="⏲️ Timers",
+        value=(
+            f"{pending_timers or '**Pending:** 0'}\n"
+            f"**Fired:** {timer_wheel.fired:,} ({timer_wheel.errors:,} errors)"
+        ),
+        inline=False
+    )
+    
+    embed.add_field(
+        name="⏱️ Event Loop",
+        value=(
+            f"**Save Blocking:** {save_stats['loop_block_ms']:.2f} ms (max {save_stats['loop_block_max_ms']:.2f} ms)\n"
+            f"**Encoding Moved Off Loop:** {save_stats['encode_ms']:.2f} ms (max {save_stats['encode_max_ms']:.2f} ms)\n"
+            f"**Loop Lag:** {loop_lag_stats['last_ms']:.2f} ms (max {loop_lag_stats['max_ms']:.2f} ms)"
+        ),
+        inline=False
+    )
+    
+    if SNAPSHOT_MODE == "fork":
+        embed.add_field(
+            name="📸 Background Snapshots",
+            value=(
+                f"**Runs:** {bgsave_stats['runs']:,} ({bgsave_stats['failures']:,} failed)\n"
+                f"**Duration:** {bgsave_stats['last_ms']:.0f} ms (max {bgsave_stats['max_ms']:.0f} ms)\n"
+                f"**Fork Pause:** {bgsave_stats['fork_ms']:.2f} ms\n"
+                f"**Copy-on-Write:** {bgsave_stats['child_private_kb']:,} kB in child\n"
+                f"**Parent RSS Growth:** {bgsave_stats['parent_rss_growth_kb']:,} kB"
+            ),
+            inline=False
+        )
+    
+    embed.add_field(name="🗄️ Storage Backend", value=storage.stats(), inline=False)
+    
+    if ACCOUNT_TIERING:
+        lookups = tier_stats['hits'] + tier_stats['faults']
+        hit_rate = tier_stats['hits'] / lookups * 100 if lookups else 0
+        embed.add_field(
+            name="🧊 Account Tiers",
+            value=(
+                f"**Hot:** {len(user_data):,} accounts (limit {HOT_ACCOUNTS_MAX or '∞'})\n"
+                f"**Cold:** {cold_account_count():,} accounts in {sum(len(blob) for blob in cold_accounts.values()):,} bytes\n"
+                f"**Hit Rate:** {hit_rate:.1f}% ({tier_stats['hits']:,} hits, {tier_stats['faults']:,} faulted in, {tier_stats['absent']:,} new)\n"
+                f"**Evictions:** {tier_stats['evictions']:,}"
+            ),
+            inline=False
+        )
+    
+    journal_size = journal_file.tell() if journal_file else 0
+    embed.add_field(
+        name="📒 Balance Journal",
+        value=(
+            f"**Sequence:** {journal_seq:,}\n"
+            f"**Appends:** {journal_stats['appends']:,} ({journal_size:,} bytes pending)\n"
+            f"**Compactions:** {journal_stats['compactions']:,}\n"
+            f"**Replayed at Startup:** {journal_stats['replayed']:,}"
+        ),
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ===== MINES GAME =====
 
 class MinesButton(discord.ui.Button):
@@ -2305,6 +4818,7 @@ class MinesButton(discord.ui.Button):
             await interaction.response.edit_message(embed=embed, view=self.view)
             
             del active_mines_games[game_id]
+            timer_wheel.cancel("mines", game_id)
             return
         
         game['revealed'].append(self.position)
@@ -2365,8 +4879,8 @@ async def cashout(interaction: discord.Interaction):
     multiplier = MINES_MULTIPLIERS.get(len(game['revealed']), 1.0)
     winnings = int(game['bet'] * multiplier)
     
-    update_balance(interaction.user.id, winnings)
-    await save_data()
+    update_balance(interaction.user.id, winnings, "mines")
+    save_scheduler.request()
     
     embed = discord.Embed(
         title="💰 Mines Game - CASH OUT!",
@@ -2384,6 +4898,7 @@ async def cashout(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
     
     del active_mines_games[game_id]
+    timer_wheel.cancel("mines", game_id)
     
     await log_action(
         "MINES",
@@ -2410,7 +4925,7 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "mines", 10):
+    if not can_use_short_cooldown(interaction.user.id, "mines"):
         await interaction.response.send_message("⏰ Please wait 10 seconds between mines games!", ephemeral=True)
         return
     
@@ -2436,9 +4951,9 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
         await interaction.response.send_message(f"❌ You need **{parsed_amount - balance:,}** more tokens to play!", ephemeral=True)
         return
     
-    update_balance(interaction.user.id, -parsed_amount)
-    set_short_cooldown(interaction.user.id, "mines")
-    await save_data()
+    update_balance(interaction.user.id, -parsed_amount, "mines")
+    set_cooldown(interaction.user.id, "mines")
+    save_scheduler.request()
     
     game_id = f"{interaction.user.id}_mines"
     
@@ -2453,6 +4968,7 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
         'created_at': datetime.now().isoformat(),
         'game_over': False
     }
+    timer_wheel.schedule("mines", game_id, time.time() + MINES_TIMEOUT, expire_mines_game, game_id)
     
     embed = discord.Embed(
         title="💎 Mines Game",
@@ -2536,7 +5052,8 @@ class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
         mines_config["max_mines"] = max_mines
         mines_config["min_bet"] = min_bet
         mines_config["max_bet"] = max_bet
-        await save_data()
+        mark_dirty("mines_config")
+        await save_scheduler.flush(now=True)
         
         embed = discord.Embed(title="✅ Mines Configuration Updated", color=0x00ff00)
         embed.add_field(name="Min Mines", value=str(min_mines), inline=True)
@@ -2570,7 +5087,7 @@ async def config_mines(interaction: discord.Interaction):
 
 @bot.tree.command(name="roblox", description="Set your Roblox username (24h cooldown)")
 async def roblox(interaction: discord.Interaction, username: str):
-    can_use, next_use = can_use_command(interaction.user.id, "roblox", 24)
+    can_use, next_use = can_use_command(interaction.user.id, "roblox")
     
     if not can_use:
         time_left = format_time(next_use)
@@ -2581,9 +5098,9 @@ async def roblox(interaction: discord.Interaction, username: str):
         await interaction.response.send_message("❌ Roblox username must be between 3-20 characters!", ephemeral=True)
         return
     
-    roblox_data[str(interaction.user.id)] = username
-    cooldowns["roblox"][str(interaction.user.id)] = datetime.now().isoformat()
-    await save_data()
+    set_roblox_username(interaction.user.id, username)
+    set_cooldown(interaction.user.id, "roblox")
+    save_scheduler.request()
     
     embed = discord.Embed(
         title="✅ Roblox Username Set!",
@@ -2619,8 +5136,8 @@ async def setroblox(interaction: discord.Interaction, user: discord.Member, user
         return
     
     old_username = roblox_data.get(str(user.id), "Not set")
-    roblox_data[str(user.id)] = username
-    await save_data()
+    set_roblox_username(user.id, username)
+    await save_scheduler.flush(now=True)
     
     embed = discord.Embed(
         title="✅ Roblox Username Updated!",
@@ -2690,7 +5207,8 @@ class CoinflipConfigModal(discord.ui.Modal, title="Coinflip Configuration"):
         
         coinflip_config["win_chance"] = win_chance
         coinflip_config["max_bet"] = max_bet
-        await save_data()
+        mark_dirty("coinflip_config")
+        await save_scheduler.flush(now=True)
         
         embed = discord.Embed(title="✅ Coinflip Configuration Updated", color=0x00ff00)
         embed.add_field(name="Win Chance", value=f"{win_chance}%", inline=True)
@@ -2793,12 +5311,13 @@ class InvitePanelView(discord.ui.View):
         
         if user_invites['invited_users']:
             recent_invites = user_invites['invited_users'][-5:]
+            await interaction.response.defer(ephemeral=True)
+            profiles = await user_directory.resolve(recent_invites)
             invite_text = ""
             for invited_id in recent_invites:
-                try:
-                    user = await bot.fetch_user(int(invited_id))
-                    invite_text += f"• {user.mention}\n"
-                except:
+                if int(invited_id) in profiles:
+                    invite_text += f"• <@{invited_id}>\n"
+                else:
                     invite_text += f"• Unknown User (ID: {invited_id})\n"
             
             if len(user_invites['invited_users']) > 5:
@@ -2810,7 +5329,10 @@ class InvitePanelView(discord.ui.View):
         
         embed.set_footer(text="Keep inviting to earn more tokens!")
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="invitespanel", description="Display invite rewards panel in a channel (Admin only)")
 @discord.app_commands.check(admin_check)
@@ -2868,7 +5390,7 @@ class DoorButton(discord.ui.Button):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if not can_use_short_cooldown(interaction.user.id, "doors", 3):
+        if not can_use_short_cooldown(interaction.user.id, "doors"):
             await interaction.response.send_message("⏰ Please wait 3 seconds between door games!", ephemeral=True)
             return
         
@@ -2878,9 +5400,9 @@ class DoorButton(discord.ui.Button):
             await interaction.response.send_message(f"❌ You need **{fee - balance:,}** more tokens to play!", ephemeral=True)
             return
         
-        update_balance(interaction.user.id, -fee)
-        set_short_cooldown(interaction.user.id, "doors")
-        await save_data()
+        update_balance(interaction.user.id, -fee, "doors")
+        set_cooldown(interaction.user.id, "doors")
+        save_scheduler.request()
         
         roll = random.random() * 100
         
@@ -2916,8 +5438,8 @@ class DoorButton(discord.ui.Button):
             titanic_prize = 0
         
         if token_prize > 0:
-            update_balance(interaction.user.id, token_prize)
-            await save_data()
+            update_balance(interaction.user.id, token_prize, "doors")
+            save_scheduler.request()
         
         embed = discord.Embed(
             title="🚪 Doors Game Result",
@@ -3045,12 +5567,226 @@ async def doorspanel(interaction: discord.Interaction, channel: discord.TextChan
 
 # ===== GIVEAWAY SYSTEM =====
 
+def draw_winners(entries, count, rng=random):
+    """Pick up to count distinct user ids, each weighted by their entry count.
+    
+    Efraimidis-Spirakis: every entrant gets the key log(u) / weight and the
+    largest keys win, which matches drawing tickets one at a time without
+    putting a winner back. O(n log count) time and O(n) space, however many
+    entries each user holds.
+    """
+    keys = ((math.log(1.0 - rng.random()) / weight, user_id) for user_id, weight in entries.items() if weight > 0)
+    return [user_id for _, user_id in heapq.nlargest(count, keys)]
+
+GIVEAWAY_DURATION = 25
+GIVEAWAY_PROGRESS_INTERVAL = 5  # seconds between countdown edits
+GIVEAWAY_SETTLE_RETRY = 30      # seconds before retrying a settlement whose save failed
+GIVEAWAY_THUMBNAIL = "https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless"
+
+# Giveaways run entirely off timer_wheel: "giveaway" settles one at its end_time and
+# "giveaway_progress" refreshes its message. Both are rebuilt from active_giveaways
+# on startup, so a restart resumes running giveaways and settles any that ended
+# while the bot was down
+
+def giveaway_deadline(giveaway):
+    try:
+        return datetime.fromisoformat(giveaway['end_time']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+def find_giveaway_by_message(message_id):
+    for giveaway in active_giveaways.values():
+        if giveaway.get('message_id') == message_id:
+            return giveaway
+    return None
+
+def giveaway_message(giveaway):
+    """Partial message for a giveaway post, or None for giveaways saved without one"""
+    if not giveaway.get('channel_id') or not giveaway.get('message_id'):
+        return None
+    return bot.get_partial_messageable(giveaway['channel_id']).get_partial_message(giveaway['message_id'])
+
+def schedule_giveaway_progress(giveaway_id, giveaway):
+    """Schedule the next countdown edit on a GIVEAWAY_PROGRESS_INTERVAL boundary before the end"""
+    deadline = giveaway_deadline(giveaway)
+    steps = math.ceil((deadline - time.time()) / GIVEAWAY_PROGRESS_INTERVAL) - 1
+    if steps >= 1 and giveaway.get('message_id'):
+        timer_wheel.schedule("giveaway_progress", giveaway_id, deadline - steps * GIVEAWAY_PROGRESS_INTERVAL,
+                             update_giveaway_message, giveaway_id)
+
+def schedule_giveaway_timers(giveaway_id, giveaway):
+    timer_wheel.schedule("giveaway", giveaway_id, giveaway_deadline(giveaway), settle_giveaway, giveaway_id)
+    schedule_giveaway_progress(giveaway_id, giveaway)
+
+def giveaway_embed(giveaway, time_left):
+    embed = discord.Embed(
+        title="🎉 TOKEN GIVEAWAY 🎉",
+        description=f"Hosted by <@{giveaway['creator']}>",
+        color=0xFFD700,
+        timestamp=datetime.now()
+    )
+    
+    embed.set_thumbnail(url=GIVEAWAY_THUMBNAIL)
+    embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
+    embed.add_field(name="👑 WINNERS", value=f"**{giveaway['winners']}** lucky winners", inline=True)
+    embed.add_field(name="⏰ TIME REMAINING", value=f"**{time_left} seconds**", inline=True)
+    embed.add_field(name="🎫 ENTRIES", value=f"**{giveaway['total_entries']:,}** entries", inline=True)
+    
+    if giveaway['total_entries'] > 0:
+        approx_chance = min(100, round((giveaway['winners'] / giveaway['total_entries']) * 100, 1))
+        embed.add_field(name="🎲 YOUR CHANCES", value=f"**~{approx_chance}%** chance to win", inline=True)
+    else:
+        embed.add_field(name="🎲 YOUR CHANCES", value="Be the first to enter!", inline=True)
+    
+    role_bonus_text = "\n".join([f"<@&{role_id}>: **+{bonus} entries**" for role_id, bonus in PRIORITY_ROLES.items()])
+    if role_bonus_text:
+        embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
+    
+    embed.set_footer(text=f"Click the button below to enter! • Ends in {time_left} seconds")
+    return embed
+
+async def update_giveaway_message(giveaway_id):
+    """Refresh a running giveaway's countdown and entry count"""
+    giveaway = active_giveaways.get(giveaway_id)
+    message = giveaway_message(giveaway) if giveaway else None
+    if message is None:
+        return
+    schedule_giveaway_progress(giveaway_id, giveaway)
+    
+    time_left = GIVEAWAY_PROGRESS_INTERVAL * round((giveaway_deadline(giveaway) - time.time()) / GIVEAWAY_PROGRESS_INTERVAL)
+    embed = giveaway_embed(giveaway, max(0, time_left))
+    
+    async def edit_progress():
+        # Skip edits that were still queued when the giveaway settled
+        if giveaway_id in active_giveaways:
+            return await message.edit(embed=embed)
+    
+    try:
+        # Progress edits are bulk: a newer one replaces any still waiting
+        await rest_scheduler.call("bulk", ("edit", giveaway['channel_id']), edit_progress, coalesce_key=("giveaway", giveaway_id))
+    except Exception as e:
+        print(f"⚠️ Error updating giveaway message: {e}")
+
+def forget_giveaway(giveaway_id):
+    active_giveaways.pop(giveaway_id, None)
+    timer_wheel.cancel("giveaway_progress", giveaway_id)
+    mark_dirty("active_giveaways")
+    save_scheduler.request()
+
+async def settle_giveaway(giveaway_id):
+    """Draw and pay a finished giveaway, or refund the host if nobody can win.
+    
+    The giveaway is saved as settled before any tokens move, so it can never
+    be paid twice: one still marked settled after a restart is only removed.
+    """
+    giveaway = active_giveaways.get(giveaway_id)
+    if giveaway is None:
+        return
+    if giveaway.get('settled'):
+        print(f"🎉 Giveaway {giveaway_id} was already paid out before a restart")
+        forget_giveaway(giveaway_id)
+        return
+    
+    creator = giveaway['creator']
+    selected_winners = draw_winners(giveaway['entries'], giveaway['winners'])
+    actual_winners_count = len(selected_winners)
+    payouts = []
+    if actual_winners_count > 0:
+        prize_per_winner = giveaway['amount'] // actual_winners_count
+        remaining_tokens = giveaway['amount'] % actual_winners_count
+        profiles = await user_directory.resolve(selected_winners)
+        for i, winner_id in enumerate(selected_winners):
+            if int(winner_id) in profiles:
+                payouts.append((winner_id, prize_per_winner + (remaining_tokens if i == 0 else 0)))
+    
+    giveaway['settled'] = True
+    mark_dirty("active_giveaways")
+    if not await save_scheduler.flush(now=True):
+        giveaway['settled'] = False
+        print(f"⚠️ Could not save giveaway {giveaway_id} as settled, retrying in {GIVEAWAY_SETTLE_RETRY}s")
+        timer_wheel.schedule("giveaway", giveaway_id, time.time() + GIVEAWAY_SETTLE_RETRY, settle_giveaway, giveaway_id)
+        return
+    
+    # Nothing is awaited from here until every payout is journaled
+    if actual_winners_count > 0:
+        winner_mentions = []
+        for winner_id, prize in payouts:
+            update_balance(winner_id, prize, "giveaway")
+            winner_mentions.append(f"<@{winner_id}> - {prize:,} 🪙")
+    else:
+        update_balance(creator, giveaway['amount'], "giveaway_refund")
+        # The daily total may already have been reset if the giveaway spanned midnight
+        day_totals = giveaway_daily_totals.get(str(creator), {})
+        day = giveaway.get('created_at', '')[:10]
+        if day in day_totals:
+            day_totals[day] = max(0, day_totals[day] - giveaway['amount'])
+            mark_dirty("giveaway_daily_totals")
+    forget_giveaway(giveaway_id)
+    
+    if actual_winners_count > 0:
+        result_embed = discord.Embed(
+            title="🎊 GIVEAWAY RESULTS 🎊",
+            description="The giveaway has ended! Here are the winners:",
+            color=0x00ff00,
+            timestamp=datetime.now()
+        )
+        
+        result_embed.add_field(name="🏆 Total Prize", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
+        result_embed.add_field(name="👑 Winners", value=f"**{actual_winners_count}**", inline=True)
+        result_embed.add_field(name="🎫 Total Entries", value=f"**{giveaway['total_entries']}**", inline=True)
+        
+        if winner_mentions:
+            winners_text = "\n".join(winner_mentions)
+            result_embed.add_field(
+                name="🎉 Congratulations to the winners!", 
+                value=winners_text, 
+                inline=False
+            )
+        
+        result_embed.add_field(
+            name="💰 Prize Distribution", 
+            value=f"Prize was split equally among {actual_winners_count} winner(s)", 
+            inline=False
+        )
+        
+        result_embed.set_footer(text="Tokens have been distributed to winners!")
+        
+        await log_action(
+            "GIVEAWAY",
+            "🎉 Giveaway Completed",
+            f"**<@{creator}>** hosted a giveaway of **{giveaway['amount']:,} tokens**",
+            color=0xFFD700,
+            user=bot.get_user(creator),
+            fields=[
+                {"name": "Total Prize", "value": f"{giveaway['amount']:,} 🪙", "inline": True},
+                {"name": "Winners", "value": f"{actual_winners_count}", "inline": True},
+                {"name": "Prize per Winner", "value": f"{prize_per_winner:,} 🪙", "inline": True},
+                {"name": "Winners", "value": "\n".join(winner_mentions) if winner_mentions else "No winners", "inline": False}
+            ]
+        )
+    else:
+        reason = "No one entered the giveaway." if giveaway['total_entries'] == 0 else "No valid winners could be selected."
+        result_embed = discord.Embed(
+            title="🎉 GIVEAWAY ENDED",
+            description=f"{reason} Tokens have been refunded.",
+            color=0xff4444
+        )
+    
+    message = giveaway_message(giveaway)
+    if message is None:
+        print(f"🎉 Settled giveaway {giveaway_id} (no message to update)")
+        return
+    try:
+        await rest_scheduler.call("user", ("edit", giveaway['channel_id']), lambda: message.edit(embed=result_embed, view=None))
+    except Exception as e:
+        print(f"⚠️ Error updating giveaway message: {e}")
+
 class GiveawayEnterView(discord.ui.View):
-    def __init__(self, giveaway_id):
-        super().__init__(timeout=25)
-        self.giveaway_id = giveaway_id
+    """One persistent view serves every giveaway; the clicked message identifies it"""
+    def __init__(self):
+        super().__init__(timeout=None)
     
-    @discord.ui.button(label="🎉 Enter Giveaway", style=discord.ButtonStyle.green, emoji="🎉")
+    @discord.ui.button(label="🎉 Enter Giveaway", style=discord.ButtonStyle.green, emoji="🎉", custom_id="giveaway:enter")
     async def enter_giveaway(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not has_linked_roblox(interaction.user.id):
             embed = discord.Embed(
@@ -3061,12 +5797,12 @@ class GiveawayEnterView(discord.ui.View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if self.giveaway_id not in active_giveaways:
+        giveaway = find_giveaway_by_message(interaction.message.id)
+        # Entries stop at the deadline, not when settlement finishes its saves
+        if giveaway is None or giveaway.get('settled') or time.time() >= giveaway_deadline(giveaway):
             await interaction.response.send_message("❌ This giveaway has ended!", ephemeral=True)
             return
         
-        giveaway = active_giveaways[self.giveaway_id]
-        
         if str(interaction.user.id) in giveaway['entries']:
             await interaction.response.send_message("❌ You've already entered this giveaway!", ephemeral=True)
             return
@@ -3079,8 +5815,9 @@ class GiveawayEnterView(discord.ui.View):
         
         giveaway['entries'][str(interaction.user.id)] = entries
         giveaway['total_entries'] += entries
+        mark_dirty("active_giveaways")
         
-        await save_data()
+        save_scheduler.request()
         
         role_bonus_text = ""
         for role_id, bonus_entries in PRIORITY_ROLES.items():
@@ -3108,7 +5845,7 @@ async def giveaway(interaction: discord.Interaction, amount: str, winners: int):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "giveaway", 30):
+    if not can_use_short_cooldown(interaction.user.id, "giveaway"):
         await interaction.response.send_message("⏰ Please wait 30 seconds before starting another giveaway!", ephemeral=True)
         return
     
@@ -3151,197 +5888,46 @@ async def giveaway(interaction: discord.Interaction, amount: str, winners: int):
         await interaction.response.send_message(f"❌ You need **{parsed_amount - balance:,}** more tokens to start this giveaway!", ephemeral=True)
         return
     
-    new_balance = update_balance(interaction.user.id, -parsed_amount)
+    new_balance = update_balance(interaction.user.id, -parsed_amount, "giveaway")
     giveaway_daily_totals[user_id][today] += parsed_amount
-    set_short_cooldown(interaction.user.id, "giveaway")
+    set_cooldown(interaction.user.id, "giveaway")
     
     giveaway_id = f"{interaction.user.id}_{int(time.time())}"
     
-    active_giveaways[giveaway_id] = {
+    giveaway = active_giveaways[giveaway_id] = {
         'creator': interaction.user.id,
         'amount': parsed_amount,
         'winners': winners,
         'entries': {},
         'total_entries': 0,
         'created_at': datetime.now().isoformat(),
-        'end_time': (datetime.now() + timedelta(seconds=25)).isoformat()
+        'end_time': (datetime.now() + timedelta(seconds=GIVEAWAY_DURATION)).isoformat(),
+        'channel_id': interaction.channel_id,
+        'message_id': None
     }
+    schedule_giveaway_timers(giveaway_id, giveaway)
+    mark_dirty("active_giveaways", "giveaway_daily_totals")
+    
+    # The escrow is already journaled; the giveaway holding it must be on disk before anyone sees it
+    await interaction.response.defer()
+    if not await save_scheduler.flush(now=True):
+        timer_wheel.cancel("giveaway", giveaway_id)
+        forget_giveaway(giveaway_id)
+        update_balance(interaction.user.id, parsed_amount, "giveaway_refund")
+        giveaway_daily_totals[user_id][today] -= parsed_amount
+        await interaction.followup.send("❌ Couldn't save the giveaway, so it was cancelled and your tokens were refunded.", ephemeral=True)
+        return
     
-    await save_data()
-    
-    embed = discord.Embed(
-        title="🎉 TOKEN GIVEAWAY 🎉",
-        description=f"Hosted by {interaction.user.mention}",
-        color=0xFFD700,
-        timestamp=datetime.now()
-    )
-    
-    embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless")
-    embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{parsed_amount:,}** 🪙", inline=True)
-    embed.add_field(name="👑 WINNERS", value=f"**{winners}** lucky winners", inline=True)
-    embed.add_field(name="⏰ TIME REMAINING", value="**25 seconds**", inline=True)
-    embed.add_field(name="🎫 ENTRIES", value="**0** entries", inline=True)
-
-    role_bonus_text = "\n".join([f"<@&{role_id}>: **+{bonus} entries**" for role_id, bonus in PRIORITY_ROLES.items()])
-    if role_bonus_text:
-        embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
-    
-    embed.set_footer(text="Click the button below to enter! • Ends in 25 seconds")
-    
-    view = GiveawayEnterView(giveaway_id)
-    await interaction.response.send_message(embed=embed, view=view)
-    
-    async def update_giveaway_message():
-        for i in range(5):
-            await asyncio.sleep(5)
-            
-            if giveaway_id not in active_giveaways:
-                break
-                
-            giveaway = active_giveaways[giveaway_id]
-            time_left = 20 - (i * 5)
-            
-            updated_embed = discord.Embed(
-                title="🎉 TOKEN GIVEAWAY 🎉",
-                description=f"Hosted by {interaction.user.mention}",
-                color=0xFFD700,
-                timestamp=datetime.now()
-            )
-            
-            updated_embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless")
-            updated_embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{parsed_amount:,}** 🪙", inline=True)
-            updated_embed.add_field(name="👑 WINNERS", value=f"**{winners}** lucky winners", inline=True)
-            updated_embed.add_field(name="⏰ TIME REMAINING", value=f"**{time_left} seconds**", inline=True)
-            updated_embed.add_field(name="🎫 ENTRIES", value=f"**{giveaway['total_entries']:,}** entries", inline=True)
-            
-            if giveaway['total_entries'] > 0:
-                approx_chance = min(100, round((winners / giveaway['total_entries']) * 100, 1))
-                updated_embed.add_field(name="🎲 YOUR CHANCES", value=f"**~{approx_chance}%** chance to win", inline=True)
-            else:
-                updated_embed.add_field(name="🎲 YOUR CHANCES", value="Be the first to enter!", inline=True)
-            
-            if role_bonus_text:
-                updated_embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
-            
-            updated_embed.set_footer(text=f"Click the button below to enter! • Ends in {time_left} seconds")
-            
-            try:
-                await interaction.edit_original_response(embed=updated_embed, view=view)
-            except:
-                break
-    
-    asyncio.create_task(update_giveaway_message())
-    
-    await asyncio.sleep(25)
-    
-    if giveaway_id in active_giveaways:
-        giveaway = active_giveaways[giveaway_id]
-        
-        if giveaway['total_entries'] > 0:
-            all_entries = []
-            for user_id, entries in giveaway['entries'].items():
-                all_entries.extend([user_id] * entries)
-            
-            unique_participants = list(set(all_entries))
-            actual_winners_count = min(giveaway['winners'], len(unique_participants))
-            
-            if actual_winners_count > 0:
-                selected_winners = random.sample(unique_participants, actual_winners_count)
-                
-                prize_per_winner = giveaway['amount'] // actual_winners_count
-                remaining_tokens = giveaway['amount'] % actual_winners_count
-                
-                winner_mentions = []
-                total_distributed = 0
-                
-                for i, winner_id in enumerate(selected_winners):
-                    try:
-                        winner = await bot.fetch_user(int(winner_id))
-                        prize = prize_per_winner + (remaining_tokens if i == 0 else 0)
-                        update_balance(winner.id, prize)
-                        total_distributed += prize
-                        winner_mentions.append(f"{winner.mention} - {prize:,} 🪙")
-                    except:
-                        continue
-                
-                result_embed = discord.Embed(
-                    title="🎊 GIVEAWAY RESULTS 🎊",
-                    description="The giveaway has ended! Here are the winners:",
-                    color=0x00ff00,
-                    timestamp=datetime.now()
-                )
-                
-                result_embed.add_field(name="🏆 Total Prize", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
-                result_embed.add_field(name="👑 Winners", value=f"**{actual_winners_count}**", inline=True)
-                result_embed.add_field(name="🎫 Total Entries", value=f"**{giveaway['total_entries']}**", inline=True)
-                
-                if winner_mentions:
-                    winners_text = "\n".join(winner_mentions)
-                    result_embed.add_field(
-                        name="🎉 Congratulations to the winners!", 
-                        value=winners_text, 
-                        inline=False
-                    )
-                
-                result_embed.add_field(
-                    name="💰 Prize Distribution", 
-                    value=f"Prize was split equally among {actual_winners_count} winner(s)", 
-                    inline=False
-                )
-                
-                result_embed.set_footer(text="Tokens have been distributed to winners!")
-                
-                await log_action(
-                    "GIVEAWAY",
-                    "🎉 Giveaway Completed",
-                    f"**{interaction.user.mention}** hosted a giveaway of **{giveaway['amount']:,} tokens**",
-                    color=0xFFD700,
-                    user=interaction.user,
-                    fields=[
-                        {"name": "Total Prize", "value": f"{giveaway['amount']:,} 🪙", "inline": True},
-                        {"name": "Winners", "value": f"{actual_winners_count}", "inline": True},
-                        {"name": "Prize per Winner", "value": f"{prize_per_winner:,} 🪙", "inline": True},
-                        {"name": "Winners", "value": "\n".join(winner_mentions) if winner_mentions else "No winners", "inline": False}
-                    ]
-                )
-                
-                try:
-                    await interaction.edit_original_response(embed=result_embed, view=None)
-                except Exception as e:
-                    print(f"⚠️ Error updating giveaway message: {e}")
-                    
-            else:
-                refund_embed = discord.Embed(
-                    title="🎉 GIVEAWAY ENDED",
-                    description="No valid winners could be selected. Tokens have been refunded.",
-                    color=0xff4444
-                )
-                
-                update_balance(interaction.user.id, giveaway['amount'])
-                giveaway_daily_totals[user_id][today] -= giveaway['amount']
-                
-                try:
-                    await interaction.edit_original_response(embed=refund_embed, view=None)
-                except:
-                    pass
-                
-        else:
-            update_balance(interaction.user.id, giveaway['amount'])
-            giveaway_daily_totals[user_id][today] -= giveaway['amount']
-            
-            refund_embed = discord.Embed(
-                title="🎉 GIVEAWAY ENDED",
-                description="No one entered the giveaway. Tokens have been refunded.",
-                color=0xff4444
-            )
-            
-            try:
-                await interaction.edit_original_response(embed=refund_embed, view=None)
-            except:
-                pass
-        
-        del active_giveaways[giveaway_id]
-        await save_data()
+    # Saving the message id lets the button, countdown and result edits survive a restart
+    try:
+        message = await interaction.followup.send(embed=giveaway_embed(giveaway, GIVEAWAY_DURATION), view=GiveawayEnterView(), wait=True)
+    except discord.HTTPException as e:
+        print(f"⚠️ Could not post giveaway message: {e}")
+        return
+    giveaway['message_id'] = message.id
+    mark_dirty("active_giveaways")
+    save_scheduler.request()
+    schedule_giveaway_progress(giveaway_id, giveaway)
 
 @bot.tree.command(name="giveawayinfo", description="Check your daily giveaway limits")
 async def giveawayinfo(interaction: discord.Interaction):
@@ -3412,8 +5998,8 @@ async def triggerevent(interaction: discord.Interaction):
     """Force start a minigame immediately"""
     global minigame_message_count
     
-    # Reset message count to trigger minigame
-    minigame_message_count = 75
+    # Restart the 75-message count from the forced minigame
+    minigame_message_count = 0
     await trigger_minigame()
     
     embed = discord.Embed(
@@ -3494,6 +6080,8 @@ async def about(ctx):
                 "`/addtoken <user> <amount>` - Add tokens to user\n"
                 "`/removetoken <user> <amount>` - Remove tokens from user\n"
                 "`/adminbalance <user>` - Check user's balance\n"
+                "`/botstats` - View bot performance statistics\n"
+                "`/tierstats` - View how many users are in each rank\n"
                 "`/addshop` - Manage shop items\n"
                 "`/resetdata <code>` - Reset all user data\n"
                 "`/config_cf` - Configure coinflip settings\n"
@@ -3534,6 +6122,19 @@ async def about(ctx):
 
 # Run the bot
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-sqlite":
+        migrate_json_to_sqlite()
+        sys.exit(0)
+    if len(sys.argv) > 2 and sys.argv[1] == "convert-snapshots":
+        convert_snapshots(sys.argv[2].lower())
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-accounts":
+        benchmark_accounts(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-snapshots":
+        benchmark_snapshots(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+        sys.exit(0)
+    
     TOKEN = os.getenv('DISCORD_BOT_TOKEN')
     
     if not TOKEN:
@@ -3541,17 +6142,11 @@ if __name__ == "__main__":
         print("💡 Set it in Railway dashboard under Variables tab")
         sys.exit(1)
     
+    # Load before connecting so no command is ever served from empty stores
+    asyncio.run(load_data())
+    
     try:
         print("🔑 Token found, connecting to Discord...")
-        import signal
-        def handle_exit(signum, frame):
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(force_save_on_exit())
-            sys.exit(0)
-            
-        signal.signal(signal.SIGTERM, handle_exit)
-        signal.signal(signal.SIGINT, handle_exit)
-        
         bot.run(TOKEN, log_handler=None)
     except discord.LoginFailure:
         print("❌ Invalid bot token!")
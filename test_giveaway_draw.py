@@ -0,0 +1,63 @@
+"""Statistical checks that draw_winners honors giveaway entry weights"""
+import math
+import random
+
+from main import PRIORITY_ROLES, draw_winners
+
+TRIALS = 100000
+
+def chi_square_critical(df, z=3.09):
+    """Approximate chi-square critical value (Wilson-Hilferty); z=3.09 is p=0.001"""
+    return df * (1 - 2 / (9 * df) + z * math.sqrt(2 / (9 * df))) ** 3
+
+def priority_entries():
+    """One entrant per combination of priority role bonuses, each with the base entry"""
+    bonuses = list(PRIORITY_ROLES.values())
+    weights = sorted({1 + sum(bonus for bit, bonus in enumerate(bonuses) if mask >> bit & 1)
+                      for mask in range(1 << len(bonuses))})
+    return {f"user{i}": weight for i, weight in enumerate(weights)}
+
+def chi_square(entries, count, expected, seed):
+    """Sum of squared deviations of each entrant's win count, scaled by its Bernoulli variance"""
+    rng = random.Random(seed)
+    hits = dict.fromkeys(entries, 0)
+    for _ in range(TRIALS):
+        for user_id in draw_winners(entries, count, rng):
+            hits[user_id] += 1
+    return sum((hits[user_id] - TRIALS * p) ** 2 / (TRIALS * p * (1 - p)) for user_id, p in expected.items())
+
+def test_single_winner_matches_entry_share():
+    entries = priority_entries()
+    total = sum(entries.values())
+    expected = {user_id: weight / total for user_id, weight in entries.items()}
+    assert chi_square(entries, 1, expected, seed=1) < chi_square_critical(len(entries) - 1)
+
+def test_two_winners_match_drawing_tickets_without_replacement():
+    entries = priority_entries()
+    total = sum(entries.values())
+    # Drawn first, or drawn second after someone else's ticket came out first
+    expected = {
+        user_id: weight / total + sum(other / total * weight / (total - other)
+                                      for other_id, other in entries.items() if other_id != user_id)
+        for user_id, weight in entries.items()
+    }
+    assert chi_square(entries, 2, expected, seed=2) < chi_square_critical(len(entries) - 1)
+
+def test_uniform_draw_would_fail():
+    entries = priority_entries()
+    total = sum(entries.values())
+    expected = {user_id: weight / total for user_id, weight in entries.items()}
+    uniform = dict.fromkeys(entries, 1)
+    assert chi_square(uniform, 1, expected, seed=3) > chi_square_critical(len(entries) - 1)
+
+def test_winners_are_distinct_and_capped_at_entrants():
+    entries = {"a": 1, "b": 5, "c": 2, "d": 0}
+    rng = random.Random(4)
+    for _ in range(1000):
+        winners = draw_winners(entries, 12, rng)
+        assert sorted(winners) == ["a", "b", "c"]
+
+def test_huge_ticket_counts():
+    entries = {user_id: weight * 10 ** 12 for user_id, weight in priority_entries().items()}
+    winners = draw_winners(entries, 3, random.Random(5))
+    assert len(set(winners)) == 3